@@ -1,7 +1,7 @@
-from enum import Enum
+from enum import IntEnum
 
 
-class ControllerTypes(Enum):
+class ControllerTypes(IntEnum):
     """Controller type enumerations for initializing the controller server."""
 
     JOYCON_L = 1
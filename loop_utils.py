@@ -0,0 +1,17 @@
+import sys
+
+
+def event_loop_factory():
+    """Return a libuv-backed event loop factory, or None if none is installed.
+
+    winloop is used on Windows and uvloop elsewhere. Both are optional, and
+    None makes asyncio fall back to its default loop.
+    """
+    try:
+        if sys.platform == "win32":
+            from winloop import new_event_loop
+        else:
+            from uvloop import new_event_loop
+    except ImportError:
+        return None
+    return new_event_loop
@@ -16,12 +16,30 @@
 # Imports
 # -----------------------------------------------------------------------------
 import asyncio
-import json
+import functools
 import logging
 import struct
 import sys
 from datetime import datetime
 
+
+def print_usage():
+    print(
+        "Usage: python run_hid_device.py <device-config> <transport-spec> <command>"
+        "  where <command> is one of:\n"
+        "  test-mode (run with menu enabled for testing)\n"
+        "  web (run a keyboard with keypress input from a web page, "
+        "see keyboard.html"
+    )
+    print("example: python run_hid_device.py hid_keyboard.json usb:0 web")
+    print("example: python run_hid_device.py hid_keyboard.json usb:0 test-mode")
+
+
+# Check the arguments before paying for the bumble imports below
+if __name__ == "__main__" and len(sys.argv) < 3:
+    print_usage()
+    sys.exit()
+
 import bumble.logging
 from bumble.core import (
     BT_HIDP_PROTOCOL_ID,
@@ -47,7 +65,19 @@ from bumble.transport import open_transport
 from websockets.asyncio import server
 from websockets.exceptions import ConnectionClosedOK
 
-from switch_protocol import SwitchProtocol
+from loop_utils import event_loop_factory
+from sdp_utils import cached_service_records
+
+try:
+    # orjson parses the small websocket event payloads several times faster
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# -----------------------------------------------------------------------------
+# Logging
+# -----------------------------------------------------------------------------
+logger = logging.getLogger(__name__)
 
 # -----------------------------------------------------------------------------
 # SDP attributes for Bluetooth HID devices
@@ -84,198 +114,177 @@ HID_SUPERVISION_TIMEOUT = 0xC80  # uint16 0xC80 (2s)
 HID_NORMALLY_CONNECTABLE = False  #  Normally connectable disabled
 HID_BOOT_DEVICE = False  #  Boot device support disabled
 
+# Vendor-defined 8-bit reports as (Report ID, Report Count), ID doubling as Usage
+VENDOR_INPUT_REPORTS = ((0x21, 48), (0x30, 48), (0x31, 102), (0x32, 102), (0x33, 102))
+VENDOR_OUTPUT_REPORTS = ((0x01, 48), (0x10, 48), (0x11, 48), (0x12, 48))
+
+
+def vendor_reports(reports, main_item: int) -> bytes:
+    """Build descriptor items for a run of vendor-defined 8-bit reports"""
+    return b"".join(
+        bytes((0x85, report_id))  # Report ID
+        + bytes((0x09, report_id))  # Usage
+        + b"\x75\x08"  # Report Size (8)
+        + bytes((0x95, report_count))  # Report Count
+        + bytes((main_item, 0x02))  # Input/Output (Data,Var,Abs)
+        for report_id, report_count in reports
+    )
+
+
 # fmt: off
 # Disable lint for commenting purposes
 # These HID descriptor comments are LLM Generated, remember to check if they are accurate if using for reference.
-HID_REPORT_MAP = bytes(  # Text String, 50 Octet Report Descriptor
-    [
-        0x05, 0x01,  # Usage Page (Generic Desktop)
-        0x09, 0x05,  # Usage (Game Pad)
-        0xA1, 0x01,  # Collection (Application)
-
-            0x06, 0x01, 0xFF,  # Usage Page (Vendor Defined 0xFF01)
-
-            0x85, 0x21,  # Report ID (33)
-            0x09, 0x21,  # Usage (0x21)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x30,  # Report Count (48)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x85, 0x30,  # Report ID (48)
-            0x09, 0x30,  # Usage (0x30)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x30,  # Report Count (48)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x85, 0x31,  # Report ID (49)
-            0x09, 0x31,  # Usage (0x31)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x66,  # Report Count (102)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x85, 0x32,  # Report ID (50)
-            0x09, 0x32,  # Usage (0x32)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x66,  # Report Count (102)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x85, 0x33,  # Report ID (51)
-            0x09, 0x33,  # Usage (0x33)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x66,  # Report Count (102)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x85, 0x3F,  # Report ID (63)
-            0x05, 0x09,  # Usage Page (Button)
-            0x19, 0x01,  # Usage Minimum (Button 1)
-            0x29, 0x10,  # Usage Maximum (Button 16)
-            0x15, 0x00,  # Logical Minimum (0)
-            0x25, 0x01,  # Logical Maximum (1)
-            0x75, 0x01,  # Report Size (1)
-            0x95, 0x10,  # Report Count (16)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x05, 0x01,  # Usage Page (Generic Desktop)
-            0x09, 0x39,  # Usage (Hat switch)
-            0x15, 0x00,  # Logical Minimum (0)
-            0x25, 0x07,  # Logical Maximum (7)
-            0x75, 0x04,  # Report Size (4)
-            0x95, 0x01,  # Report Count (1)
-            0x81, 0x42,  # Input (Data,Var,Abs,Null State)
-            0x05, 0x09,  # Usage Page (Button)
-            0x75, 0x04,  # Report Size (4)
-            0x95, 0x01,  # Report Count (1)
-            0x81, 0x01,  # Input (Constant)
-
-            0x05, 0x01,  # Usage Page (Generic Desktop)
-            0x09, 0x30,  # Usage (X)
-            0x09, 0x31,  # Usage (Y)
-            0x09, 0x33,  # Usage (Rx)
-            0x09, 0x34,  # Usage (Ry)
-            0x16, 0x00, 0x00,  # Logical Minimum (0)
-            0x26, 0xFF, 0xFF,  # Logical Maximum (65535)
-            0x75, 0x10,  # Report Size (16)
-            0x95, 0x04,  # Report Count (4)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x06, 0x01, 0xFF,  # Usage Page (Vendor Defined 0xFF01)
-            0x85, 0x01,  # Report ID (1)
-            0x09, 0x01,  # Usage (0x01)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x30,  # Report Count (48)
-            0x91, 0x02,  # Output (Data,Var,Abs)
-
-            0x85, 0x10,  # Report ID (16)
-            0x09, 0x10,  # Usage (0x10)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x30,  # Report Count (48)
-            0x91, 0x02,  # Output (Data,Var,Abs)
-
-            0x85, 0x11,  # Report ID (17)
-            0x09, 0x11,  # Usage (0x11)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x30,  # Report Count (48)
-            0x91, 0x02,  # Output (Data,Var,Abs)
-
-            0x85, 0x12,  # Report ID (18)
-            0x09, 0x12,  # Usage (0x12)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x30,  # Report Count (48)
-            0x91, 0x02,  # Output (Data,Var,Abs)
-
-        0xC0  # End Collection
-    ])
-    # fmt: on
+HID_REPORT_MAP = b"".join((  # Text String, 50 Octet Report Descriptor
+    b"\x05\x01",  # Usage Page (Generic Desktop)
+    b"\x09\x05",  # Usage (Game Pad)
+    b"\xA1\x01",  # Collection (Application)
+
+        b"\x06\x01\xFF",  # Usage Page (Vendor Defined 0xFF01)
+        vendor_reports(VENDOR_INPUT_REPORTS, 0x81),  # Input
+
+        (
+        b"\x85\x3F"  # Report ID (63)
+        b"\x05\x09"  # Usage Page (Button)
+        b"\x19\x01"  # Usage Minimum (Button 1)
+        b"\x29\x10"  # Usage Maximum (Button 16)
+        b"\x15\x00"  # Logical Minimum (0)
+        b"\x25\x01"  # Logical Maximum (1)
+        b"\x75\x01"  # Report Size (1)
+        b"\x95\x10"  # Report Count (16)
+        b"\x81\x02"  # Input (Data,Var,Abs)
+
+        b"\x05\x01"  # Usage Page (Generic Desktop)
+        b"\x09\x39"  # Usage (Hat switch)
+        b"\x15\x00"  # Logical Minimum (0)
+        b"\x25\x07"  # Logical Maximum (7)
+        b"\x75\x04"  # Report Size (4)
+        b"\x95\x01"  # Report Count (1)
+        b"\x81\x42"  # Input (Data,Var,Abs,Null State)
+        b"\x05\x09"  # Usage Page (Button)
+        b"\x75\x04"  # Report Size (4)
+        b"\x95\x01"  # Report Count (1)
+        b"\x81\x01"  # Input (Constant)
+
+        b"\x05\x01"  # Usage Page (Generic Desktop)
+        b"\x09\x30"  # Usage (X)
+        b"\x09\x31"  # Usage (Y)
+        b"\x09\x33"  # Usage (Rx)
+        b"\x09\x34"  # Usage (Ry)
+        b"\x16\x00\x00"  # Logical Minimum (0)
+        b"\x26\xFF\xFF"  # Logical Maximum (65535)
+        b"\x75\x10"  # Report Size (16)
+        b"\x95\x04"  # Report Count (4)
+        b"\x81\x02"  # Input (Data,Var,Abs)
+        ),
+
+        b"\x06\x01\xFF",  # Usage Page (Vendor Defined 0xFF01)
+        vendor_reports(VENDOR_OUTPUT_REPORTS, 0x91),  # Output
+
+    b"\xC0",  # End Collection
+))
+# fmt: on
+
 
 # Default protocol mode set to report protocol
 protocol_mode = Message.ProtocolMode.REPORT_PROTOCOL
 
+# Report types compared on every GET_REPORT/SET_REPORT
+INPUT_REPORT = Message.ReportType.INPUT_REPORT
+OUTPUT_REPORT = Message.ReportType.OUTPUT_REPORT
+FEATURE_REPORT = Message.ReportType.FEATURE_REPORT
+OTHER_REPORT = Message.ReportType.OTHER_REPORT
+
+# DataElement nodes that appear more than once in the SDP record, shared so
+# each is allocated (and serialized) only once
+_L2CAP_UUID = DataElement.uuid(BT_L2CAP_PROTOCOL_ID)
+_HIDP_UUID = DataElement.uuid(BT_HIDP_PROTOCOL_ID)
+_HID_SERVICE_UUID = DataElement.uuid(BT_HUMAN_INTERFACE_DEVICE_SERVICE)
+_BOOLEANS = {value: DataElement(DataElement.BOOLEAN, value) for value in (False, True)}
+
 
 def sdp_records():
     service_record_handle = 0x00010002
     return {
-        service_record_handle: [
+        service_record_handle: (
             ServiceAttribute(
                 SDP_SERVICE_RECORD_HANDLE_ATTRIBUTE_ID,  # 0x0001
                 DataElement.sequence(
-                    [DataElement.uuid(BT_HUMAN_INTERFACE_DEVICE_SERVICE)]  # 0x1124
+                    (
+                        _HID_SERVICE_UUID,  # 0x1124
+                    )
                 ),
             ),
             ServiceAttribute(
                 SDP_PROTOCOL_DESCRIPTOR_LIST_ATTRIBUTE_ID,
                 DataElement.sequence(
-                    [
+                    (
                         DataElement.sequence(
-                            [
-                                DataElement.uuid(BT_L2CAP_PROTOCOL_ID),  # 0x0100
+                            (
+                                _L2CAP_UUID,  # 0x0100
                                 DataElement.unsigned_integer_16(17),  # 0x0011
-                            ]
+                            )
                         ),
                         DataElement.sequence(
-                            [
-                                DataElement.uuid(BT_HIDP_PROTOCOL_ID),  # 0x0011
-                            ]
+                            (
+                                _HIDP_UUID,  # 0x0011
+                            )
                         ),
-                    ]
+                    )
                 ),
             ),
             ServiceAttribute(
                 SDP_BROWSE_GROUP_LIST_ATTRIBUTE_ID,  # 0x0005
                 DataElement.sequence(
-                    [DataElement.uuid(SDP_PUBLIC_BROWSE_ROOT)]
+                    (DataElement.uuid(SDP_PUBLIC_BROWSE_ROOT),)
                 ),  # 0x1002
             ),
             ServiceAttribute(
                 SDP_LANGUAGE_BASE_ATTRIBUTE_ID_LIST_ATTRIBUTE_ID,  # 0x0006
                 DataElement.sequence(
-                    [
+                    (
                         DataElement.unsigned_integer_16(LANGUAGE),  # 0x656E
                         DataElement.unsigned_integer_16(ENCODING),  # 0x006a
                         DataElement.unsigned_integer_16(
                             PRIMARY_LANGUAGE_BASE_ID
                         ),  # 0x0100
-                    ]
+                    )
                 ),
             ),
             ServiceAttribute(
                 SDP_BLUETOOTH_PROFILE_DESCRIPTOR_LIST_ATTRIBUTE_ID,  # 0x0009
                 DataElement.sequence(
-                    [
+                    (
                         DataElement.sequence(
-                            [
-                                DataElement.uuid(
-                                    BT_HUMAN_INTERFACE_DEVICE_SERVICE
-                                ),  # 0x1124
+                            (
+                                _HID_SERVICE_UUID,  # 0x1124
                                 DataElement.unsigned_integer_16(0x0101),  # 0x0101
-                            ]
-                        )
-                    ]
+                            )
+                        ),
+                    )
                 ),
             ),
             ServiceAttribute(
                 SDP_ADDITIONAL_PROTOCOL_DESCRIPTOR_LIST_ATTRIBUTE_ID,  # 0x000D
                 DataElement.sequence(
-                    [
+                    (
                         DataElement.sequence(
-                            [
+                            (
                                 DataElement.sequence(
-                                    [
-                                        DataElement.uuid(
-                                            BT_L2CAP_PROTOCOL_ID
-                                        ),  # 0x0100
+                                    (
+                                        _L2CAP_UUID,  # 0x0100
                                         DataElement.unsigned_integer_16(
                                             0x0013
                                         ),  # 0x0013
-                                    ]
+                                    )
                                 ),
                                 DataElement.sequence(
-                                    [
-                                        DataElement.uuid(BT_HIDP_PROTOCOL_ID),  # 0x0011
-                                    ]
+                                    (
+                                        _HIDP_UUID,  # 0x0011
+                                    )
                                 ),
-                            ]
+                            )
                         ),
-                    ]
+                    )
                 ),
             ),
             # ------------- HID SDP Atrribute Values See HID v1.1.1 "5.3 Service Discovery Protocol (SDP)" --------------
@@ -305,51 +314,51 @@ def sdp_records():
             ),
             ServiceAttribute(
                 SDP_HID_VIRTUAL_CABLE_ATTRIBUTE_ID,  # 0x0204
-                DataElement(DataElement.BOOLEAN, HID_VIRTUAL_CABLE),
+                _BOOLEANS[HID_VIRTUAL_CABLE],
             ),
             ServiceAttribute(
                 SDP_HID_RECONNECT_INITIATE_ATTRIBUTE_ID,  # 0x0205
-                DataElement(DataElement.BOOLEAN, HID_VIRTUAL_CABLE),
+                _BOOLEANS[HID_VIRTUAL_CABLE],
             ),
             ServiceAttribute(
                 SDP_HID_DESCRIPTOR_LIST_ATTRIBUTE_ID,  # 0x0206
                 DataElement.sequence(
-                    [
+                    (
                         DataElement.sequence(
-                            [
+                            (
                                 DataElement.unsigned_integer_8(
                                     0x22
                                 ),  # Report Descriptor Type
                                 DataElement(DataElement.TEXT_STRING, HID_REPORT_MAP),
-                            ]
+                            )
                         ),
-                    ]
+                    )
                 ),
             ),
             ServiceAttribute(
                 SDP_HID_LANGID_BASE_LIST_ATTRIBUTE_ID,  # 0x0207
                 DataElement.sequence(
-                    [
+                    (
                         DataElement.sequence(
-                            [
+                            (
                                 DataElement.unsigned_integer_16(
                                     0x0409
                                 ),  # English (United States)
                                 DataElement.unsigned_integer_16(
                                     0x0409
                                 ),  # English (United States)
-                            ]
+                            )
                         ),
-                    ]
+                    )
                 ),
             ),
             ServiceAttribute(
                 SDP_HID_BATTERY_POWER_ATTRIBUTE_ID,  # 0x0209
-                DataElement(DataElement.BOOLEAN, HID_BATTERY_POWER),
+                _BOOLEANS[HID_BATTERY_POWER],
             ),
             ServiceAttribute(
                 SDP_HID_REMOTE_WAKE_ATTRIBUTE_ID,  # 0x020A
-                DataElement(DataElement.BOOLEAN, HID_REMOTE_WAKE),
+                _BOOLEANS[HID_REMOTE_WAKE],
             ),
             ServiceAttribute(
                 SDP_HID_SUPERVISION_TIMEOUT_ATTRIBUTE_ID,  # 0x020C
@@ -357,38 +366,65 @@ def sdp_records():
             ),
             ServiceAttribute(
                 SDP_HID_NORMALLY_CONNECTABLE_ATTRIBUTE_ID,  # 0x020D
-                DataElement(DataElement.BOOLEAN, HID_NORMALLY_CONNECTABLE),
+                _BOOLEANS[HID_NORMALLY_CONNECTABLE],
             ),
             ServiceAttribute(
                 SDP_HID_BOOT_DEVICE_ATTRIBUTE_ID,  # 0x020E
-                DataElement(DataElement.BOOLEAN, HID_BOOT_DEVICE),
+                _BOOLEANS[HID_BOOT_DEVICE],
             ),
-        ]
+        )
     }
 
 
+sdp_service_records = cached_service_records(sdp_records)
+
+
 # -----------------------------------------------------------------------------
 async def get_stream_reader(pipe) -> asyncio.StreamReader:
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     reader = asyncio.StreamReader(loop=loop)
     protocol = asyncio.StreamReaderProtocol(reader)
     await loop.connect_read_pipe(lambda: protocol, pipe)
     return reader
 
 
+# Keyboard input report (ID 0x01) with no keys pressed
+KEYBOARD_IDLE = b"\x01" + bytes(8)
+
+# Keys a to z mapped to their HID usage IDs (0x04 to 0x1D)
+KEY_TO_HID = {chr(ord("a") + offset): 0x04 + offset for offset in range(26)}
+
+# Mouse input report: report ID, buttons, signed x and y deltas
+MOUSE_REPORT = struct.Struct(">BBbb")
+MOUSE_IDLE = MOUSE_REPORT.pack(0x02, 0x00, 0, 0)
+# Logical min and max of the mouse x and y deltas
+MOUSE_MIN = -127
+MOUSE_MAX = 127
+
+# Lengths of the input reports served by GET_REPORT, report ID byte included,
+# so SET_REPORT size checks are a single lookup
+INPUT_REPORT_SIZES = {0x01: len(KEYBOARD_IDLE), 0x02: len(MOUSE_IDLE)}
+
+
+def clamp_mouse_delta(value: int) -> int:
+    """Limit a mouse delta to the report's logical min and max"""
+    if value < MOUSE_MIN:
+        return MOUSE_MIN
+    if value > MOUSE_MAX:
+        return MOUSE_MAX
+    return value
+
+
 class DeviceData:
     def __init__(self) -> None:
-        self.keyboardData = bytearray(
-            [0x01, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
-        )
-        self.mouseData = bytearray([0x02, 0x00, 0x00, 0x00])
+        self.keyboardData = bytearray(KEYBOARD_IDLE)
+        self.mouseData = bytearray(MOUSE_IDLE)
 
 
 class GamepadData:
     def __init__(self) -> None:
-        self.gamepadData = bytearray(
-            [0x03, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
-        )
+        self.gamepadData = bytearray(9)
+        self.gamepadData[0] = 0x03
 
 
 # Device's live data - Mouse and Keyboard will be stored in this
@@ -396,232 +432,162 @@ deviceData = DeviceData()
 
 
 # -----------------------------------------------------------------------------
-async def gamepad_device(hid_device: HID_Device):
+async def ws_input_device(
+    hid_device: HID_Device, host: str = "localhost", port: int = 8989
+):
     # Start a Websocket server to receive events from a web page
     async def serve(websocket: server.ServerConnection):
-        global deviceData
+        # Bind the per-message lookups once for the lifetime of the connection
+        recv = websocket.recv
+        send = hid_device.send_data
+        loads = json_loads
+        # Reports are written in place; send_data copies them before returning
+        keyboard_report = deviceData.keyboardData
+        mouse_report = deviceData.mouseData
         while True:
             try:
-                message = await websocket.recv()
-                print("Received: ", str(message))
-                parsed = json.loads(message)
+                message = await recv()
+                logger.debug("Received: %s", message)
+                parsed = loads(message)
                 message_type = parsed["type"]
                 if message_type == "keydown":
                     # Only deal with keys a to z for now
-                    key = parsed["key"]
-                    if len(key) == 1:
-                        code = ord(key)
-                        if ord("a") <= code <= ord("z"):
-                            hid_code = 0x04 + code - ord("a")
-                            deviceData.keyboardData = bytearray(
-                                [
-                                    0x01,
-                                    0x00,
-                                    0x00,
-                                    hid_code,
-                                    0x00,
-                                    0x00,
-                                    0x00,
-                                    0x00,
-                                    0x00,
-                                ]
-                            )
-                            hid_device.send_data(deviceData.keyboardData)
+                    hid_code = KEY_TO_HID.get(parsed["key"])
+                    if hid_code is not None:
+                        # Auto-repeat resends the same key, which is still
+                        # forwarded but needs no rewrite of the report
+                        if keyboard_report[3] != hid_code:
+                            keyboard_report[:] = KEYBOARD_IDLE
+                            keyboard_report[3] = hid_code
+                        send(keyboard_report)
                 elif message_type == "keyup":
-                    deviceData.keyboardData = bytearray(
-                        [0x01, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
-                    )
-                    hid_device.send_data(deviceData.keyboardData)
+                    if keyboard_report != KEYBOARD_IDLE:
+                        keyboard_report[:] = KEYBOARD_IDLE
+                        send(keyboard_report)
                 elif message_type == "mousemove":
-                    # logical min and max values
-                    log_min = -127
-                    log_max = 127
-                    x = parsed["x"]
-                    y = parsed["y"]
                     # limiting x and y values within logical max and min range
-                    x = max(log_min, min(log_max, x))
-                    y = max(log_min, min(log_max, y))
-                    deviceData.mouseData = bytearray([0x02, 0x00]) + struct.pack(
-                        ">bb", x, y
-                    )
-                    hid_device.send_data(deviceData.mouseData)
+                    x = clamp_mouse_delta(parsed["x"])
+                    y = clamp_mouse_delta(parsed["y"])
+                    # Deltas are relative, so only a repeated zero move is redundant
+                    if x or y or mouse_report != MOUSE_IDLE:
+                        MOUSE_REPORT.pack_into(mouse_report, 0, 0x02, 0x00, x, y)
+                        send(mouse_report)
             except ConnectionClosedOK:
                 pass
 
     # pylint: disable-next=no-member
-    await server.serve(serve, "localhost", 8989)
-    await asyncio.get_event_loop().create_future()
+    async with server.serve(serve, host, port) as ws_server:
+        await ws_server.serve_forever()
 
 
-async def keyboard_device(hid_device: HID_Device):
-    # Start a Websocket server to receive events from a web page
-    async def serve(websocket: server.ServerConnection):
-        global deviceData
-        while True:
-            try:
-                message = await websocket.recv()
-                print("Received: ", str(message))
-                parsed = json.loads(message)
-                message_type = parsed["type"]
-                if message_type == "keydown":
-                    # Only deal with keys a to z for now
-                    key = parsed["key"]
-                    if len(key) == 1:
-                        code = ord(key)
-                        if ord("a") <= code <= ord("z"):
-                            hid_code = 0x04 + code - ord("a")
-                            deviceData.keyboardData = bytearray(
-                                [
-                                    0x01,
-                                    0x00,
-                                    0x00,
-                                    hid_code,
-                                    0x00,
-                                    0x00,
-                                    0x00,
-                                    0x00,
-                                    0x00,
-                                ]
-                            )
-                            hid_device.send_data(deviceData.keyboardData)
-                elif message_type == "keyup":
-                    deviceData.keyboardData = bytearray(
-                        [0x01, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
-                    )
-                    hid_device.send_data(deviceData.keyboardData)
-                elif message_type == "mousemove":
-                    # logical min and max values
-                    log_min = -127
-                    log_max = 127
-                    x = parsed["x"]
-                    y = parsed["y"]
-                    # limiting x and y values within logical max and min range
-                    x = max(log_min, min(log_max, x))
-                    y = max(log_min, min(log_max, y))
-                    deviceData.mouseData = bytearray([0x02, 0x00]) + struct.pack(
-                        ">bb", x, y
-                    )
-                    hid_device.send_data(deviceData.mouseData)
-            except ConnectionClosedOK:
-                pass
-
-    # pylint: disable-next=no-member
-    await server.serve(serve, "localhost", 8989)
-    await asyncio.get_event_loop().create_future()
+# Both demos share the same websocket relay
+gamepad_device = keyboard_device = ws_input_device
 
 
 # -----------------------------------------------------------------------------
-async def main() -> None:
-    if len(sys.argv) < 3:
-        print(
-            "Usage: python run_hid_device.py <device-config> <transport-spec> <command>"
-            "  where <command> is one of:\n"
-            "  test-mode (run with menu enabled for testing)\n"
-            "  web (run a keyboard with keypress input from a web page, "
-            "see keyboard.html"
-        )
-        print("example: python run_hid_device.py hid_keyboard.json usb:0 web")
-        print("example: python run_hid_device.py hid_keyboard.json usb:0 test-mode")
-
-        return
-
-    async def handle_virtual_cable_unplug():
-        hid_host_bd_addr = str(hid_device.remote_device_bd_address)
-        await hid_device.disconnect_interrupt_channel()
-        await hid_device.disconnect_control_channel()
-        await device.keystore.delete(hid_host_bd_addr)  # type: ignore
-        connection = hid_device.connection
-        if connection is not None:
-            await connection.disconnect()
-
-    def on_hid_data_cb(pdu: bytes):
-        print(f"Received Data, PDU: {pdu.hex()}")
-
-    def on_get_report_cb(
-        report_id: int, report_type: int, buffer_size: int
-    ) -> HID_Device.GetSetStatus:
-        retValue = hid_device.GetSetStatus()
-        print(
-            "GET_REPORT report_id: "
-            + str(report_id)
-            + "report_type: "
-            + str(report_type)
-            + "buffer_size:"
-            + str(buffer_size)
-        )
-        if report_type == Message.ReportType.INPUT_REPORT:
-            if report_id == 1:
-                retValue.data = deviceData.keyboardData[1:]
-                retValue.status = hid_device.GetSetReturn.SUCCESS
-            elif report_id == 2:
-                retValue.data = deviceData.mouseData[1:]
-                retValue.status = hid_device.GetSetReturn.SUCCESS
-            else:
-                retValue.status = hid_device.GetSetReturn.REPORT_ID_NOT_FOUND
-
-            if buffer_size:
-                data_len = buffer_size - 1
-                retValue.data = retValue.data[:data_len]
-        elif report_type == Message.ReportType.OUTPUT_REPORT:
-            # This sample app has nothing to do with the report received, to enable PTS
-            # testing, we will return single byte random data.
-            retValue.data = bytearray([0x11])
-            retValue.status = hid_device.GetSetReturn.SUCCESS
-        elif report_type == Message.ReportType.FEATURE_REPORT:
-            retValue.status = hid_device.GetSetReturn.ERR_INVALID_PARAMETER
-        elif report_type == Message.ReportType.OTHER_REPORT:
-            if report_id == 3:
-                retValue.status = hid_device.GetSetReturn.REPORT_ID_NOT_FOUND
+async def handle_virtual_cable_unplug(device: Device, hid_device: HID_Device):
+    hid_host_bd_addr = str(hid_device.remote_device_bd_address)
+    await hid_device.disconnect_interrupt_channel()
+    await hid_device.disconnect_control_channel()
+    await device.keystore.delete(hid_host_bd_addr)  # type: ignore
+    connection = hid_device.connection
+    if connection is not None:
+        await connection.disconnect()
+
+
+def on_hid_data_cb(pdu: bytes):
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received Data, PDU: %s", pdu.hex())
+
+
+def on_get_report_cb(
+    report_id: int, report_type: int, buffer_size: int
+) -> HID_Device.GetSetStatus:
+    retValue = HID_Device.GetSetStatus()
+    logger.debug(
+        "GET_REPORT report_id: %s report_type: %s buffer_size: %s",
+        report_id,
+        report_type,
+        buffer_size,
+    )
+    if report_type == INPUT_REPORT:
+        if report_id == 1:
+            retValue.data = deviceData.keyboardData[1:]
+            retValue.status = HID_Device.GetSetReturn.SUCCESS
+        elif report_id == 2:
+            retValue.data = deviceData.mouseData[1:]
+            retValue.status = HID_Device.GetSetReturn.SUCCESS
         else:
-            retValue.status = hid_device.GetSetReturn.FAILURE
-
-        return retValue
-
-    def on_set_report_cb(
-        report_id: int, report_type: int, report_size: int, data: bytes
-    ) -> HID_Device.GetSetStatus:
-        print(
-            "SET_REPORT report_id: "
-            + str(report_id)
-            + "report_type: "
-            + str(report_type)
-            + "report_size "
-            + str(report_size)
-            + "data:"
-            + str(data)
-        )
-        if report_type == Message.ReportType.FEATURE_REPORT:
+            retValue.status = HID_Device.GetSetReturn.REPORT_ID_NOT_FOUND
+
+        if buffer_size:
+            data_len = buffer_size - 1
+            retValue.data = retValue.data[:data_len]
+    elif report_type == OUTPUT_REPORT:
+        # This sample app has nothing to do with the report received, to enable PTS
+        # testing, we will return single byte random data.
+        retValue.data = bytearray([0x11])
+        retValue.status = HID_Device.GetSetReturn.SUCCESS
+    elif report_type == FEATURE_REPORT:
+        retValue.status = HID_Device.GetSetReturn.ERR_INVALID_PARAMETER
+    elif report_type == OTHER_REPORT:
+        if report_id == 3:
+            retValue.status = HID_Device.GetSetReturn.REPORT_ID_NOT_FOUND
+    else:
+        retValue.status = HID_Device.GetSetReturn.FAILURE
+
+    return retValue
+
+
+def on_set_report_cb(
+    report_id: int, report_type: int, report_size: int, data: bytes
+) -> HID_Device.GetSetStatus:
+    logger.debug(
+        "SET_REPORT report_id: %s report_type: %s report_size: %s data: %s",
+        report_id,
+        report_type,
+        report_size,
+        data,
+    )
+    if report_type == FEATURE_REPORT:
+        status = HID_Device.GetSetReturn.ERR_INVALID_PARAMETER
+    elif report_type == INPUT_REPORT:
+        expected_size = INPUT_REPORT_SIZES.get(report_id)
+        if report_id == 3:
+            status = HID_Device.GetSetReturn.REPORT_ID_NOT_FOUND
+        elif expected_size is not None and report_size != expected_size:
             status = HID_Device.GetSetReturn.ERR_INVALID_PARAMETER
-        elif report_type == Message.ReportType.INPUT_REPORT:
-            if report_id == 1 and report_size != len(deviceData.keyboardData):
-                status = HID_Device.GetSetReturn.ERR_INVALID_PARAMETER
-            elif report_id == 2 and report_size != len(deviceData.mouseData):
-                status = HID_Device.GetSetReturn.ERR_INVALID_PARAMETER
-            elif report_id == 3:
-                status = HID_Device.GetSetReturn.REPORT_ID_NOT_FOUND
-            else:
-                status = HID_Device.GetSetReturn.SUCCESS
         else:
             status = HID_Device.GetSetReturn.SUCCESS
+    else:
+        status = HID_Device.GetSetReturn.SUCCESS
 
-        return HID_Device.GetSetStatus(status=status)
+    return HID_Device.GetSetStatus(status=status)
 
-    def on_get_protocol_cb() -> HID_Device.GetSetStatus:
-        return HID_Device.GetSetStatus(
-            data=bytes([protocol_mode]),
-            status=hid_device.GetSetReturn.SUCCESS,
-        )
 
-    def on_set_protocol_cb(protocol: int) -> HID_Device.GetSetStatus:
-        # We do not support SET_PROTOCOL.
-        print(f"SET_PROTOCOL report_id: {protocol}")
-        return HID_Device.GetSetStatus(
-            status=hid_device.GetSetReturn.ERR_UNSUPPORTED_REQUEST
-        )
+def on_get_protocol_cb() -> HID_Device.GetSetStatus:
+    return HID_Device.GetSetStatus(
+        data=bytes([protocol_mode]),
+        status=HID_Device.GetSetReturn.SUCCESS,
+    )
+
+
+def on_set_protocol_cb(protocol: int) -> HID_Device.GetSetStatus:
+    # We do not support SET_PROTOCOL.
+    logger.debug("SET_PROTOCOL protocol: %s", protocol)
+    return HID_Device.GetSetStatus(
+        status=HID_Device.GetSetReturn.ERR_UNSUPPORTED_REQUEST
+    )
+
+
+def on_virtual_cable_unplug_cb(device: Device, hid_device: HID_Device):
+    print("Received Virtual Cable Unplug")
+    asyncio.create_task(handle_virtual_cable_unplug(device, hid_device))
 
-    def on_virtual_cable_unplug_cb():
-        print("Received Virtual Cable Unplug")
-        asyncio.create_task(handle_virtual_cable_unplug())
+
+# -----------------------------------------------------------------------------
+async def main() -> None:
+    bumble.logging.setup_basic_logging("INFO")
 
     print("<<< connecting to HCI...")
     async with await open_transport(sys.argv[2]) as hci_transport:
@@ -645,10 +611,13 @@ async def main() -> None:
         hid_device.register_set_protocol_cb(on_set_protocol_cb)
 
         # Register for virtual cable unplug call back
-        hid_device.on("virtual_cable_unplug", on_virtual_cable_unplug_cb)
+        hid_device.on(
+            "virtual_cable_unplug",
+            functools.partial(on_virtual_cable_unplug_cb, device, hid_device),
+        )
 
         # Setup the SDP to advertise HID Device service
-        device.sdp_service_records = sdp_records()
+        device.sdp_service_records = sdp_service_records()
 
         # Start the controller
         await device.power_on()
@@ -659,6 +628,12 @@ async def main() -> None:
 
         async def menu():
             reader = await get_stream_reader(sys.stdin)
+            channel_actions = {
+                "1": hid_device.connect_control_channel,
+                "2": hid_device.connect_interrupt_channel,
+                "3": hid_device.disconnect_control_channel,
+                "4": hid_device.disconnect_interrupt_channel,
+            }
             while True:
                 print(
                     "\n************************ HID Device Menu *****************************\n"
@@ -675,49 +650,32 @@ async def main() -> None:
                 print("10. Exit ")
                 print("\nEnter your choice : \n")
 
-                choice = await reader.readline()
-                choice = choice.decode("utf-8").strip()
-
-                if choice == "1":
-                    await hid_device.connect_control_channel()
+                choice = (await reader.readline()).decode().strip()
 
-                elif choice == "2":
-                    await hid_device.connect_interrupt_channel()
-
-                elif choice == "3":
-                    await hid_device.disconnect_control_channel()
-
-                elif choice == "4":
-                    await hid_device.disconnect_interrupt_channel()
+                channel_action = channel_actions.get(choice)
+                if channel_action is not None:
+                    await channel_action()
 
                 elif choice == "5":
                     print(" 1. Report ID 0x01")
                     print(" 2. Report ID 0x02")
                     print(" 3. Invalid Report ID")
 
-                    choice1 = await reader.readline()
-                    choice1 = choice1.decode("utf-8").strip()
+                    choice1 = (await reader.readline()).decode().strip()
 
                     if choice1 == "1":
-                        data = bytearray(
-                            [0x01, 0x00, 0x00, 0x04, 0x00, 0x00, 0x00, 0x00, 0x00]
-                        )
-                        hid_device.send_data(data)
-                        data = bytearray(
-                            [0x01, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
-                        )
+                        data = bytearray(KEYBOARD_IDLE)
+                        data[3] = 0x04
                         hid_device.send_data(data)
+                        hid_device.send_data(KEYBOARD_IDLE)
 
                     elif choice1 == "2":
-                        data = bytearray([0x02, 0x00, 0x00, 0xF6])
-                        hid_device.send_data(data)
-                        data = bytearray([0x02, 0x00, 0x00, 0x00])
-                        hid_device.send_data(data)
+                        hid_device.send_data(MOUSE_REPORT.pack(0x02, 0x00, 0, -10))
+                        hid_device.send_data(MOUSE_IDLE)
 
                     elif choice1 == "3":
-                        data = bytearray([0x00, 0x00, 0x00, 0x00])
+                        data = bytes(4)
                         hid_device.send_data(data)
-                        data = bytearray([0x00, 0x00, 0x00, 0x00])
                         hid_device.send_data(data)
 
                     else:
@@ -750,6 +708,7 @@ async def main() -> None:
                     connection = await device.connect(
                         hid_host_bd_addr, transport=PhysicalTransport.BR_EDR
                     )
+                    # Encryption can only start once the link is authenticated
                     await connection.authenticate()
                     await connection.encrypt()
 
@@ -771,5 +730,6 @@ async def main() -> None:
 
 
 # -----------------------------------------------------------------------------
-bumble.logging.setup_basic_logging("DEBUG")
-asyncio.run(main())
+if __name__ == "__main__":
+    with asyncio.Runner(loop_factory=event_loop_factory()) as runner:
+        runner.run(main())
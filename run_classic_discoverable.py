@@ -39,55 +39,64 @@ from bumble.sdp import (
 )
 from bumble.transport import open_transport
 
+from sdp_utils import cached_service_records
+
+
 # -----------------------------------------------------------------------------
-SDP_SERVICE_RECORDS = {
-    0x00010001: [
-        ServiceAttribute(
-            SDP_SERVICE_RECORD_HANDLE_ATTRIBUTE_ID,
-            DataElement.unsigned_integer_32(0x00010001),
-        ),
-        ServiceAttribute(
-            SDP_BROWSE_GROUP_LIST_ATTRIBUTE_ID,
-            DataElement.sequence([DataElement.uuid(SDP_PUBLIC_BROWSE_ROOT)]),
-        ),
-        ServiceAttribute(
-            SDP_SERVICE_CLASS_ID_LIST_ATTRIBUTE_ID,
-            DataElement.sequence([DataElement.uuid(BT_AUDIO_SINK_SERVICE)]),
-        ),
-        ServiceAttribute(
-            SDP_PROTOCOL_DESCRIPTOR_LIST_ATTRIBUTE_ID,
-            DataElement.sequence(
-                [
-                    DataElement.sequence(
-                        [
-                            DataElement.uuid(BT_L2CAP_PROTOCOL_ID),
-                            DataElement.unsigned_integer_16(25),
-                        ]
-                    ),
-                    DataElement.sequence(
-                        [
-                            DataElement.uuid(BT_AVDTP_PROTOCOL_ID),
-                            DataElement.unsigned_integer_16(256),
-                        ]
-                    ),
-                ]
+def sdp_records():
+    return {
+        0x00010001: [
+            ServiceAttribute(
+                SDP_SERVICE_RECORD_HANDLE_ATTRIBUTE_ID,
+                DataElement.unsigned_integer_32(0x00010001),
+            ),
+            ServiceAttribute(
+                SDP_BROWSE_GROUP_LIST_ATTRIBUTE_ID,
+                DataElement.sequence([DataElement.uuid(SDP_PUBLIC_BROWSE_ROOT)]),
+            ),
+            ServiceAttribute(
+                SDP_SERVICE_CLASS_ID_LIST_ATTRIBUTE_ID,
+                DataElement.sequence([DataElement.uuid(BT_AUDIO_SINK_SERVICE)]),
             ),
-        ),
-        ServiceAttribute(
-            SDP_BLUETOOTH_PROFILE_DESCRIPTOR_LIST_ATTRIBUTE_ID,
-            DataElement.sequence(
-                [
-                    DataElement.sequence(
-                        [
-                            DataElement.uuid(BT_ADVANCED_AUDIO_DISTRIBUTION_SERVICE),
-                            DataElement.unsigned_integer_16(256),
-                        ]
-                    )
-                ]
+            ServiceAttribute(
+                SDP_PROTOCOL_DESCRIPTOR_LIST_ATTRIBUTE_ID,
+                DataElement.sequence(
+                    [
+                        DataElement.sequence(
+                            [
+                                DataElement.uuid(BT_L2CAP_PROTOCOL_ID),
+                                DataElement.unsigned_integer_16(25),
+                            ]
+                        ),
+                        DataElement.sequence(
+                            [
+                                DataElement.uuid(BT_AVDTP_PROTOCOL_ID),
+                                DataElement.unsigned_integer_16(256),
+                            ]
+                        ),
+                    ]
+                ),
             ),
-        ),
-    ]
-}
+            ServiceAttribute(
+                SDP_BLUETOOTH_PROFILE_DESCRIPTOR_LIST_ATTRIBUTE_ID,
+                DataElement.sequence(
+                    [
+                        DataElement.sequence(
+                            [
+                                DataElement.uuid(
+                                    BT_ADVANCED_AUDIO_DISTRIBUTION_SERVICE
+                                ),
+                                DataElement.unsigned_integer_16(256),
+                            ]
+                        )
+                    ]
+                ),
+            ),
+        ]
+    }
+
+
+sdp_service_records = cached_service_records(sdp_records)
 
 
 # -----------------------------------------------------------------------------
@@ -106,7 +115,7 @@ async def main() -> None:
             sys.argv[1], hci_transport.source, hci_transport.sink
         )
         device.classic_enabled = True
-        device.sdp_service_records = SDP_SERVICE_RECORDS
+        device.sdp_service_records = sdp_service_records()
         await device.power_on()
 
         # Start being discoverable and connectable
@@ -117,5 +126,5 @@ async def main() -> None:
 
 
 # -----------------------------------------------------------------------------
-bumble.logging.setup_basic_logging("DEBUG")
+bumble.logging.setup_basic_logging("INFO")
 asyncio.run(main())
@@ -46,6 +46,9 @@ from bumble.sdp import (
 )
 from bumble.transport import open_transport
 
+from loop_utils import event_loop_factory
+from sdp_utils import cached_service_records
+
 # -----------------------------------------------------------------------------
 # SDP attributes for Bluetooth HID devices
 SDP_HID_SERVICE_NAME_ATTRIBUTE_ID = 0x0100
@@ -93,127 +96,68 @@ HID_NORMALLY_CONNECTABLE = True  #  Normally connectable enabled
 HID_BOOT_DEVICE = True  #  Boot device support enabled
 HID_SSR_HOST_MAX_LATENCY = 0x640  # uint16 0x640 (1s)
 HID_SSR_HOST_MIN_TIMEOUT = 0xC80  # uint16 0xC80 (2s)
-HID_REPORT_MAP = bytes(  # Text String, 50 Octet Report Descriptor
+HID_REPORT_MAP = (  # Text String, 50 Octet Report Descriptor
     # pylint: disable=line-too-long
-    [
-        0x05,
-        0x01,  # Usage Page (Generic Desktop Ctrls)
-        0x09,
-        0x06,  # Usage (Keyboard)
-        0xA1,
-        0x01,  # Collection (Application)
-        0x85,
-        0x01,  # . Report ID (1)
-        0x05,
-        0x07,  # . Usage Page (Kbrd/Keypad)
-        0x19,
-        0xE0,  # . Usage Minimum (0xE0)
-        0x29,
-        0xE7,  # . Usage Maximum (0xE7)
-        0x15,
-        0x00,  # . Logical Minimum (0)
-        0x25,
-        0x01,  # . Logical Maximum (1)
-        0x75,
-        0x01,  # . Report Size (1)
-        0x95,
-        0x08,  # . Report Count (8)
-        0x81,
-        0x02,  # . Input (Data,Var,Abs,No Wrap,Linear,Preferred State,No Null Position)
-        0x95,
-        0x01,  # . Report Count (1)
-        0x75,
-        0x08,  # . Report Size (8)
-        0x81,
-        0x03,  # . Input (Const,Var,Abs,No Wrap,Linear,Preferred State,No Null Position)
-        0x95,
-        0x05,  # . Report Count (5)
-        0x75,
-        0x01,  # . Report Size (1)
-        0x05,
-        0x08,  # . Usage Page (LEDs)
-        0x19,
-        0x01,  # . Usage Minimum (Num Lock)
-        0x29,
-        0x05,  # . Usage Maximum (Kana)
-        0x91,
-        0x02,  # . Output (Data,Var,Abs,No Wrap,Linear,Preferred State,No Null Position,Non-volatile)
-        0x95,
-        0x01,  # . Report Count (1)
-        0x75,
-        0x03,  # . Report Size (3)
-        0x91,
-        0x03,  # . Output (Const,Var,Abs,No Wrap,Linear,Preferred State,No Null Position,Non-volatile)
-        0x95,
-        0x06,  # . Report Count (6)
-        0x75,
-        0x08,  # . Report Size (8)
-        0x15,
-        0x00,  # . Logical Minimum (0)
-        0x25,
-        0x65,  # . Logical Maximum (101)
-        0x05,
-        0x07,  # . Usage Page (Kbrd/Keypad)
-        0x19,
-        0x00,  # . Usage Minimum (0x00)
-        0x29,
-        0x65,  # . Usage Maximum (0x65)
-        0x81,
-        0x00,  # . Input (Data,Array,Abs,No Wrap,Linear,Preferred State,No Null Position)
-        0xC0,  # End Collection
-        0x05,
-        0x01,  # Usage Page (Generic Desktop Ctrls)
-        0x09,
-        0x02,  # Usage (Mouse)
-        0xA1,
-        0x01,  # Collection (Application)
-        0x85,
-        0x02,  # . Report ID (2)
-        0x09,
-        0x01,  # . Usage (Pointer)
-        0xA1,
-        0x00,  # . Collection (Physical)
-        0x05,
-        0x09,  # .   Usage Page (Button)
-        0x19,
-        0x01,  # .   Usage Minimum (0x01)
-        0x29,
-        0x03,  # .   Usage Maximum (0x03)
-        0x15,
-        0x00,  # .   Logical Minimum (0)
-        0x25,
-        0x01,  # .   Logical Maximum (1)
-        0x95,
-        0x03,  # .   Report Count (3)
-        0x75,
-        0x01,  # .   Report Size (1)
-        0x81,
-        0x02,  # .   Input (Data,Var,Abs,No Wrap,Linear,Preferred State,No Null Position)
-        0x95,
-        0x01,  # .   Report Count (1)
-        0x75,
-        0x05,  # .   Report Size (5)
-        0x81,
-        0x03,  # .   Input (Const,Var,Abs,No Wrap,Linear,Preferred State,No Null Position)
-        0x05,
-        0x01,  # .   Usage Page (Generic Desktop Ctrls)
-        0x09,
-        0x30,  # .   Usage (X)
-        0x09,
-        0x31,  # .   Usage (Y)
-        0x15,
-        0x81,  # .   Logical Minimum (-127)
-        0x25,
-        0x7F,  # .   Logical Maximum (127)
-        0x75,
-        0x08,  # .   Report Size (8)
-        0x95,
-        0x02,  # .   Report Count (2)
-        0x81,
-        0x06,  # .   Input (Data,Var,Rel,No Wrap,Linear,Preferred State,No Null Position)
-        0xC0,  # . End Collection
-        0xC0,  # End Collection
-    ]
+    b'\x05\x01'  # Usage Page (Generic Desktop Ctrls)
+    b'\x09\x06'  # Usage (Keyboard)
+    b'\xa1\x01'  # Collection (Application)
+    b'\x85\x01'  # . Report ID (1)
+    b'\x05\x07'  # . Usage Page (Kbrd/Keypad)
+    b'\x19\xe0'  # . Usage Minimum (0xE0)
+    b'\x29\xe7'  # . Usage Maximum (0xE7)
+    b'\x15\x00'  # . Logical Minimum (0)
+    b'\x25\x01'  # . Logical Maximum (1)
+    b'\x75\x01'  # . Report Size (1)
+    b'\x95\x08'  # . Report Count (8)
+    b'\x81\x02'  # . Input (Data,Var,Abs,No Wrap,Linear,Preferred State,No Null Position)
+    b'\x95\x01'  # . Report Count (1)
+    b'\x75\x08'  # . Report Size (8)
+    b'\x81\x03'  # . Input (Const,Var,Abs,No Wrap,Linear,Preferred State,No Null Position)
+    b'\x95\x05'  # . Report Count (5)
+    b'\x75\x01'  # . Report Size (1)
+    b'\x05\x08'  # . Usage Page (LEDs)
+    b'\x19\x01'  # . Usage Minimum (Num Lock)
+    b'\x29\x05'  # . Usage Maximum (Kana)
+    b'\x91\x02'  # . Output (Data,Var,Abs,No Wrap,Linear,Preferred State,No Null Position,Non-volatile)
+    b'\x95\x01'  # . Report Count (1)
+    b'\x75\x03'  # . Report Size (3)
+    b'\x91\x03'  # . Output (Const,Var,Abs,No Wrap,Linear,Preferred State,No Null Position,Non-volatile)
+    b'\x95\x06'  # . Report Count (6)
+    b'\x75\x08'  # . Report Size (8)
+    b'\x15\x00'  # . Logical Minimum (0)
+    b'\x25\x65'  # . Logical Maximum (101)
+    b'\x05\x07'  # . Usage Page (Kbrd/Keypad)
+    b'\x19\x00'  # . Usage Minimum (0x00)
+    b'\x29\x65'  # . Usage Maximum (0x65)
+    b'\x81\x00'  # . Input (Data,Array,Abs,No Wrap,Linear,Preferred State,No Null Position)
+    b'\xc0'  # End Collection
+    b'\x05\x01'  # Usage Page (Generic Desktop Ctrls)
+    b'\x09\x02'  # Usage (Mouse)
+    b'\xa1\x01'  # Collection (Application)
+    b'\x85\x02'  # . Report ID (2)
+    b'\x09\x01'  # . Usage (Pointer)
+    b'\xa1\x00'  # . Collection (Physical)
+    b'\x05\x09'  # .   Usage Page (Button)
+    b'\x19\x01'  # .   Usage Minimum (0x01)
+    b'\x29\x03'  # .   Usage Maximum (0x03)
+    b'\x15\x00'  # .   Logical Minimum (0)
+    b'\x25\x01'  # .   Logical Maximum (1)
+    b'\x95\x03'  # .   Report Count (3)
+    b'\x75\x01'  # .   Report Size (1)
+    b'\x81\x02'  # .   Input (Data,Var,Abs,No Wrap,Linear,Preferred State,No Null Position)
+    b'\x95\x01'  # .   Report Count (1)
+    b'\x75\x05'  # .   Report Size (5)
+    b'\x81\x03'  # .   Input (Const,Var,Abs,No Wrap,Linear,Preferred State,No Null Position)
+    b'\x05\x01'  # .   Usage Page (Generic Desktop Ctrls)
+    b'\x09\x30'  # .   Usage (X)
+    b'\x09\x31'  # .   Usage (Y)
+    b'\x15\x81'  # .   Logical Minimum (-127)
+    b'\x25\x7f'  # .   Logical Maximum (127)
+    b'\x75\x08'  # .   Report Size (8)
+    b'\x95\x02'  # .   Report Count (2)
+    b'\x81\x06'  # .   Input (Data,Var,Rel,No Wrap,Linear,Preferred State,No Null Position)
+    b'\xc0'  # . End Collection
+    b'\xc0'  # End Collection
 )
 
 
@@ -399,6 +343,9 @@ def sdp_records():
     }
 
 
+sdp_service_records = cached_service_records(sdp_records)
+
+
 # -----------------------------------------------------------------------------
 async def get_stream_reader(pipe) -> asyncio.StreamReader:
     loop = asyncio.get_event_loop()
@@ -408,6 +355,12 @@ async def get_stream_reader(pipe) -> asyncio.StreamReader:
     return reader
 
 
+# Input report lengths from HID_REPORT_MAP, report ID byte included
+KEYBOARD_REPORT_LEN = 9
+MOUSE_REPORT_LEN = 4
+INPUT_REPORT_SIZES = {0x01: KEYBOARD_REPORT_LEN, 0x02: MOUSE_REPORT_LEN}
+
+
 class DeviceData:
     def __init__(self) -> None:
         self.keyboardData = bytearray(
@@ -561,12 +514,11 @@ async def main() -> None:
         if report_type == Message.ReportType.FEATURE_REPORT:
             status = HID_Device.GetSetReturn.ERR_INVALID_PARAMETER
         elif report_type == Message.ReportType.INPUT_REPORT:
-            if report_id == 1 and report_size != len(deviceData.keyboardData):
-                status = HID_Device.GetSetReturn.ERR_INVALID_PARAMETER
-            elif report_id == 2 and report_size != len(deviceData.mouseData):
-                status = HID_Device.GetSetReturn.ERR_INVALID_PARAMETER
-            elif report_id == 3:
+            expected_size = INPUT_REPORT_SIZES.get(report_id)
+            if report_id == 3:
                 status = HID_Device.GetSetReturn.REPORT_ID_NOT_FOUND
+            elif expected_size is not None and report_size != expected_size:
+                status = HID_Device.GetSetReturn.ERR_INVALID_PARAMETER
             else:
                 status = HID_Device.GetSetReturn.SUCCESS
         else:
@@ -616,7 +568,7 @@ async def main() -> None:
         hid_device.on('virtual_cable_unplug', on_virtual_cable_unplug_cb)
 
         # Setup the SDP to advertise HID Device service
-        device.sdp_service_records = sdp_records()
+        device.sdp_service_records = sdp_service_records()
 
         # Start the controller
         await device.power_on()
@@ -739,5 +691,5 @@ async def main() -> None:
 
 
 # -----------------------------------------------------------------------------
-bumble.logging.setup_basic_logging('DEBUG')
-asyncio.run(main())
+bumble.logging.setup_basic_logging('INFO')
+asyncio.run(main(), loop_factory=event_loop_factory())
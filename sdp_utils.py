@@ -0,0 +1,28 @@
+import functools
+
+
+def preserialize_service_records(service_records):
+    """Encode every SDP attribute value once, up front.
+
+    bumble caches the encoding on each DataElement, so SDP responses reuse
+    those bytes instead of walking the value trees again. The attribute list
+    around the values is still assembled for every response.
+    """
+    for attributes in service_records.values():
+        for attribute in attributes:
+            bytes(attribute.value)
+    return service_records
+
+
+def cached_service_records(build_records):
+    """Wrap an SDP record builder so it only runs on first use.
+
+    Every call of the returned function gives back the same records, with
+    their attribute values already encoded.
+    """
+
+    @functools.cache
+    def service_records():
+        return preserialize_service_records(build_records())
+
+    return service_records
@@ -2,7 +2,10 @@
 # Ported from nxbt for Bumble framework
 
 import asyncio
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 
 import bumble.logging
@@ -29,6 +32,8 @@ from bumble.sdp import (
 from bumble.transport import open_transport
 
 from controller import ControllerTypes
+from loop_utils import event_loop_factory
+from sdp_utils import cached_service_records
 from switch_protocol import ControllerProtocol
 
 SDP_HID_SERVICE_NAME_ATTRIBUTE_ID = 0x0100
@@ -66,108 +71,123 @@ HID_BOOT_DEVICE = False
 # fmt: off
 # Disable lint for commenting purposes
 # These HID descriptor comments are LLM Generated, remember to check if they are accurate if using for reference.
-HID_REPORT_MAP = bytes(  # Text String, 50 Octet Report Descriptor
-    [
-        0x05, 0x01,  # Usage Page (Generic Desktop)
-        0x09, 0x05,  # Usage (Game Pad)
-        0xA1, 0x01,  # Collection (Application)
-
-            0x06, 0x01, 0xFF,  # Usage Page (Vendor Defined 0xFF01)
-
-            0x85, 0x21,  # Report ID (33)
-            0x09, 0x21,  # Usage (0x21)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x30,  # Report Count (48)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x85, 0x30,  # Report ID (48)
-            0x09, 0x30,  # Usage (0x30)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x30,  # Report Count (48)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x85, 0x31,  # Report ID (49)
-            0x09, 0x31,  # Usage (0x31)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x66,  # Report Count (102)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x85, 0x32,  # Report ID (50)
-            0x09, 0x32,  # Usage (0x32)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x66,  # Report Count (102)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x85, 0x33,  # Report ID (51)
-            0x09, 0x33,  # Usage (0x33)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x66,  # Report Count (102)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x85, 0x3F,  # Report ID (63)
-            0x05, 0x09,  # Usage Page (Button)
-            0x19, 0x01,  # Usage Minimum (Button 1)
-            0x29, 0x10,  # Usage Maximum (Button 16)
-            0x15, 0x00,  # Logical Minimum (0)
-            0x25, 0x01,  # Logical Maximum (1)
-            0x75, 0x01,  # Report Size (1)
-            0x95, 0x10,  # Report Count (16)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x05, 0x01,  # Usage Page (Generic Desktop)
-            0x09, 0x39,  # Usage (Hat switch)
-            0x15, 0x00,  # Logical Minimum (0)
-            0x25, 0x07,  # Logical Maximum (7)
-            0x75, 0x04,  # Report Size (4)
-            0x95, 0x01,  # Report Count (1)
-            0x81, 0x42,  # Input (Data,Var,Abs,Null State)
-            0x05, 0x09,  # Usage Page (Button)
-            0x75, 0x04,  # Report Size (4)
-            0x95, 0x01,  # Report Count (1)
-            0x81, 0x01,  # Input (Constant)
-
-            0x05, 0x01,  # Usage Page (Generic Desktop)
-            0x09, 0x30,  # Usage (X)
-            0x09, 0x31,  # Usage (Y)
-            0x09, 0x33,  # Usage (Rx)
-            0x09, 0x34,  # Usage (Ry)
-            0x16, 0x00, 0x00,  # Logical Minimum (0)
-            0x26, 0xFF, 0xFF,  # Logical Maximum (65535)
-            0x75, 0x10,  # Report Size (16)
-            0x95, 0x04,  # Report Count (4)
-            0x81, 0x02,  # Input (Data,Var,Abs)
-
-            0x06, 0x01, 0xFF,  # Usage Page (Vendor Defined 0xFF01)
-            0x85, 0x01,  # Report ID (1)
-            0x09, 0x01,  # Usage (0x01)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x30,  # Report Count (48)
-            0x91, 0x02,  # Output (Data,Var,Abs)
-
-            0x85, 0x10,  # Report ID (16)
-            0x09, 0x10,  # Usage (0x10)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x30,  # Report Count (48)
-            0x91, 0x02,  # Output (Data,Var,Abs)
-
-            0x85, 0x11,  # Report ID (17)
-            0x09, 0x11,  # Usage (0x11)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x30,  # Report Count (48)
-            0x91, 0x02,  # Output (Data,Var,Abs)
-
-            0x85, 0x12,  # Report ID (18)
-            0x09, 0x12,  # Usage (0x12)
-            0x75, 0x08,  # Report Size (8)
-            0x95, 0x30,  # Report Count (48)
-            0x91, 0x02,  # Output (Data,Var,Abs)
-
-        0xC0  # End Collection
-    ])
-    # fmt: on
+HID_REPORT_MAP = (  # Text String, 50 Octet Report Descriptor
+    b"\x05\x01"  # Usage Page (Generic Desktop)
+    b"\x09\x05"  # Usage (Game Pad)
+    b"\xA1\x01"  # Collection (Application)
+
+        b"\x06\x01\xFF"  # Usage Page (Vendor Defined 0xFF01)
+
+        b"\x85\x21"  # Report ID (33)
+        b"\x09\x21"  # Usage (0x21)
+        b"\x75\x08"  # Report Size (8)
+        b"\x95\x30"  # Report Count (48)
+        b"\x81\x02"  # Input (Data,Var,Abs)
+
+        b"\x85\x30"  # Report ID (48)
+        b"\x09\x30"  # Usage (0x30)
+        b"\x75\x08"  # Report Size (8)
+        b"\x95\x30"  # Report Count (48)
+        b"\x81\x02"  # Input (Data,Var,Abs)
+
+        b"\x85\x31"  # Report ID (49)
+        b"\x09\x31"  # Usage (0x31)
+        b"\x75\x08"  # Report Size (8)
+        b"\x95\x66"  # Report Count (102)
+        b"\x81\x02"  # Input (Data,Var,Abs)
+
+        b"\x85\x32"  # Report ID (50)
+        b"\x09\x32"  # Usage (0x32)
+        b"\x75\x08"  # Report Size (8)
+        b"\x95\x66"  # Report Count (102)
+        b"\x81\x02"  # Input (Data,Var,Abs)
+
+        b"\x85\x33"  # Report ID (51)
+        b"\x09\x33"  # Usage (0x33)
+        b"\x75\x08"  # Report Size (8)
+        b"\x95\x66"  # Report Count (102)
+        b"\x81\x02"  # Input (Data,Var,Abs)
+
+        b"\x85\x3F"  # Report ID (63)
+        b"\x05\x09"  # Usage Page (Button)
+        b"\x19\x01"  # Usage Minimum (Button 1)
+        b"\x29\x10"  # Usage Maximum (Button 16)
+        b"\x15\x00"  # Logical Minimum (0)
+        b"\x25\x01"  # Logical Maximum (1)
+        b"\x75\x01"  # Report Size (1)
+        b"\x95\x10"  # Report Count (16)
+        b"\x81\x02"  # Input (Data,Var,Abs)
+
+        b"\x05\x01"  # Usage Page (Generic Desktop)
+        b"\x09\x39"  # Usage (Hat switch)
+        b"\x15\x00"  # Logical Minimum (0)
+        b"\x25\x07"  # Logical Maximum (7)
+        b"\x75\x04"  # Report Size (4)
+        b"\x95\x01"  # Report Count (1)
+        b"\x81\x42"  # Input (Data,Var,Abs,Null State)
+        b"\x05\x09"  # Usage Page (Button)
+        b"\x75\x04"  # Report Size (4)
+        b"\x95\x01"  # Report Count (1)
+        b"\x81\x01"  # Input (Constant)
+
+        b"\x05\x01"  # Usage Page (Generic Desktop)
+        b"\x09\x30"  # Usage (X)
+        b"\x09\x31"  # Usage (Y)
+        b"\x09\x33"  # Usage (Rx)
+        b"\x09\x34"  # Usage (Ry)
+        b"\x16\x00\x00"  # Logical Minimum (0)
+        b"\x26\xFF\xFF"  # Logical Maximum (65535)
+        b"\x75\x10"  # Report Size (16)
+        b"\x95\x04"  # Report Count (4)
+        b"\x81\x02"  # Input (Data,Var,Abs)
+
+        b"\x06\x01\xFF"  # Usage Page (Vendor Defined 0xFF01)
+        b"\x85\x01"  # Report ID (1)
+        b"\x09\x01"  # Usage (0x01)
+        b"\x75\x08"  # Report Size (8)
+        b"\x95\x30"  # Report Count (48)
+        b"\x91\x02"  # Output (Data,Var,Abs)
+
+        b"\x85\x10"  # Report ID (16)
+        b"\x09\x10"  # Usage (0x10)
+        b"\x75\x08"  # Report Size (8)
+        b"\x95\x30"  # Report Count (48)
+        b"\x91\x02"  # Output (Data,Var,Abs)
+
+        b"\x85\x11"  # Report ID (17)
+        b"\x09\x11"  # Usage (0x11)
+        b"\x75\x08"  # Report Size (8)
+        b"\x95\x30"  # Report Count (48)
+        b"\x91\x02"  # Output (Data,Var,Abs)
+
+        b"\x85\x12"  # Report ID (18)
+        b"\x09\x12"  # Usage (0x12)
+        b"\x75\x08"  # Report Size (8)
+        b"\x95\x30"  # Report Count (48)
+        b"\x91\x02"  # Output (Data,Var,Abs)
+
+    b"\xC0"  # End Collection
+)
+# fmt: on
+
+# HID descriptor list attribute value, wrapping the fixed report descriptor
+HID_DESCRIPTOR_LIST = DataElement.sequence(
+    (
+        DataElement.sequence(
+            (
+                DataElement.unsigned_integer_8(0x22),  # Report Descriptor Type
+                DataElement(DataElement.TEXT_STRING, HID_REPORT_MAP),
+            )
+        ),
+    )
+)
 
 protocol_mode = Message.ProtocolMode.REPORT_PROTOCOL
 
+# Input report periods while pairing and once paired (Pro Controllers run at 132 Hz)
+PAIRING_REPORT_PERIOD = 1 / 15
+FULL_REPORT_PERIOD = 1 / 132
+
 
 def sdp_records():
     service_record_handle = 0x00010002
@@ -181,84 +201,84 @@ def sdp_records():
             ServiceAttribute(
                 SDP_SERVICE_RECORD_HANDLE_ATTRIBUTE_ID,  # 0x0001
                 DataElement.sequence(
-                    [DataElement.uuid(BT_HUMAN_INTERFACE_DEVICE_SERVICE)]  # 0x1124
+                    (DataElement.uuid(BT_HUMAN_INTERFACE_DEVICE_SERVICE),)  # 0x1124
                 ),
             ),
             ServiceAttribute(
                 SDP_PROTOCOL_DESCRIPTOR_LIST_ATTRIBUTE_ID,  # 0x0004
                 DataElement.sequence(
-                    [
+                    (
                         DataElement.sequence(
-                            [
+                            (
                                 DataElement.uuid(BT_L2CAP_PROTOCOL_ID),  # 0x0100
                                 DataElement.unsigned_integer_16(0x0011),  # 0x0011
-                            ]
+                            )
                         ),
                         DataElement.sequence(
-                            [
+                            (
                                 DataElement.uuid(BT_HIDP_PROTOCOL_ID),  # 0x0011
-                            ]
+                            )
                         ),
-                    ]
+                    )
                 ),
             ),
             ServiceAttribute(
                 SDP_BROWSE_GROUP_LIST_ATTRIBUTE_ID,  # 0x0005
                 DataElement.sequence(
-                    [DataElement.uuid(SDP_PUBLIC_BROWSE_ROOT)]
+                    (DataElement.uuid(SDP_PUBLIC_BROWSE_ROOT),)
                 ),  # 0x1002
             ),
             ServiceAttribute(
                 SDP_LANGUAGE_BASE_ATTRIBUTE_ID_LIST_ATTRIBUTE_ID,  # 0x0006
                 DataElement.sequence(
-                    [
+                    (
                         DataElement.unsigned_integer_16(LANGUAGE),  # 0x656E
                         DataElement.unsigned_integer_16(ENCODING),  # 0x006a
                         DataElement.unsigned_integer_16(
                             PRIMARY_LANGUAGE_BASE_ID
                         ),  # 0x0100
-                    ]
+                    )
                 ),
             ),
             ServiceAttribute(
                 SDP_BLUETOOTH_PROFILE_DESCRIPTOR_LIST_ATTRIBUTE_ID,  # 0x0009
                 DataElement.sequence(
-                    [
+                    (
                         DataElement.sequence(
-                            [
+                            (
                                 DataElement.uuid(
                                     BT_HUMAN_INTERFACE_DEVICE_SERVICE
                                 ),  # 0x1124
                                 DataElement.unsigned_integer_16(0x0101),  # 0x0101
-                            ]
-                        )
-                    ]
+                            )
+                        ),
+                    )
                 ),
             ),
             ServiceAttribute(
                 SDP_ADDITIONAL_PROTOCOL_DESCRIPTOR_LIST_ATTRIBUTE_ID,  # 0x000D
                 DataElement.sequence(
-                    [
+                    (
                         DataElement.sequence(
-                            [
+                            (
                                 DataElement.sequence(
-                                    [
+                                    (
                                         DataElement.uuid(
                                             BT_L2CAP_PROTOCOL_ID
                                         ),  # 0x0100
                                         DataElement.unsigned_integer_16(
                                             0x0013
                                         ),  # 0x0013
-                                    ]
+                                    )
                                 ),
                                 DataElement.sequence(
-                                    [
+                                    (
                                         DataElement.uuid(BT_HIDP_PROTOCOL_ID),  # 0x0011
-                                    ]
+                                    )
                                 ),
-                            ]
+                            )
                         ),
-                    ]
+                    )
                 ),
             ),
             # ------------- HID SDP Atrribute Values See HID v1.1.1 "5.3 Service Discovery Protocol (SDP)" --------------
@@ -296,32 +316,21 @@ def sdp_records():
             ),
             ServiceAttribute(
                 SDP_HID_DESCRIPTOR_LIST_ATTRIBUTE_ID,  # 0x0206
-                DataElement.sequence(
-                    [
-                        DataElement.sequence(
-                            [
-                                DataElement.unsigned_integer_8(
-                                    0x22
-                                ),  # Report Descriptor Type
-                                DataElement(DataElement.TEXT_STRING, HID_REPORT_MAP),
-                            ]
-                        ),
-                    ]
-                ),
+                HID_DESCRIPTOR_LIST,
             ),
             ServiceAttribute(
                 SDP_HID_LANGID_BASE_LIST_ATTRIBUTE_ID,  # 0x0207
                 DataElement.sequence(
-                    [
+                    (
                         DataElement.sequence(
-                            [
+                            (
                                 DataElement.unsigned_integer_16(
                                     0x0409
                                 ),  # English (United States)
                                 DataElement.unsigned_integer_16(0x0100),
-                            ]
+                            )
                         ),
-                    ]
+                    )
                 ),
             ),
             ServiceAttribute(
@@ -348,6 +357,9 @@ def sdp_records():
     }
 
 
+sdp_service_records = cached_service_records(sdp_records)
+
+
 def setup_logging():
     """Setup logging to console and file"""
     console_handler = logging.StreamHandler()
@@ -360,27 +372,33 @@ def setup_logging():
     console_handler.setFormatter(formatter)
     file_handler.setFormatter(formatter)
 
+    # Per-packet traces are written to disk on a listener thread, so the
+    # event loop only pays for enqueueing a record
+    log_queue = queue.SimpleQueue()
+    file_listener = logging.handlers.QueueListener(log_queue, file_handler)
+    file_listener.start()
+    atexit.register(file_listener.stop)
+
     logger = logging.getLogger("switch_pair")
     logger.setLevel(logging.DEBUG)
     logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
 
     return logger
 
 
-def format_switch_msg(data: bytes, direction: str) -> str:
-    """Format Switch packet for logging"""
+def format_switch_msg(data: bytes, subcmd_id: int | None, direction: str) -> str:
+    """Format Switch packet for logging, given its byte 11 (None if absent)"""
     if len(data) < 11:
         return f"{direction}: Too short ({len(data)} bytes)"
 
-    payload = " ".join(f"{b:02X}" for b in data[:11])
+    payload = data[:11].hex(" ").upper()
     subcmd = ""
 
-    if len(data) > 11:
-        subcmd_id = data[11]
+    if subcmd_id is not None:
         subcmd = f"| Sub: 0x{subcmd_id:02X}"
         if len(data) > 12:
-            subcmd_data = " ".join(f"{b:02X}" for b in data[12:])
+            subcmd_data = data[12:].hex(" ").upper()
             subcmd += f" {subcmd_data}"
 
     return f"[{direction}] Payload: {payload} {subcmd}"
@@ -402,18 +420,18 @@ def handle_virtual_cable_unplug(hid_device: HID_Device, device: Device):
 
 async def main() -> None:
     if len(sys.argv) < 3:
-        print("Usage: python switch_pair.py <device-config> <transport-spec>")
-        print("example: python switch_pair.py pro_controller.json usb:0")
-        print("")
-        print("Press Ctrl+C to exit")
+        print(
+            "Usage: python switch_pair.py <device-config> <transport-spec>",
+            "example: python switch_pair.py pro_controller.json usb:0",
+            "",
+            "Press Ctrl+C to exit",
+            sep="\n",
+        )
         return
 
     logger = setup_logging()
 
-    print("=" * 60)
-    print("Pro Controller Switch Pairing POC")
-    print("=" * 60)
-    print("")
+    print("=" * 60, "Pro Controller Switch Pairing POC", "=" * 60, "", sep="\n")
 
     if len(sys.argv) == 4:
         bt_address = sys.argv[3]
@@ -422,6 +440,8 @@ async def main() -> None:
 
     # Pairing state tracking
     pairing_event = asyncio.Event()
+    # Set once the Switch has queried device info and will accept input reports
+    device_info_event = asyncio.Event()
     received_first_message = False
     packet_count = 0
 
@@ -429,56 +449,67 @@ async def main() -> None:
 
     def on_hid_data_cb(pdu: bytes):
         nonlocal received_first_message
+        subcmd = pdu[11] if len(pdu) > 11 else None
 
-        packet_log = format_switch_msg(pdu, "RX")
-        logger.debug(packet_log)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(format_switch_msg(pdu, subcmd, "RX"))
 
         # Track when we receive first actual Switch message
         if pdu is not None:
-            print("RECEIVED SWITCH MESSAGE")
+            logger.debug("RECEIVED SWITCH MESSAGE")
             received_first_message = True
 
         if len(pdu) > 40:
-            print(f"  [RX] Switch command: 0x{pdu[11]:02X}")
+            logger.debug("[RX] Switch command: 0x%02X", subcmd)
 
         # Process Switch command and generate immediate response
         protocol.process_commands(pdu)
-        report = protocol.get_report_no_clear()
+        report = protocol.report_view()
 
         if len(report) > 1:
-            tx_log = format_switch_msg(report, "TX")
-            logger.debug(tx_log)
+            if logger.isEnabledFor(logging.DEBUG):
+                tx_subcmd = report[11] if len(report) > 11 else None
+                logger.debug(format_switch_msg(report, tx_subcmd, "TX"))
             if len(report) > 20:
-                print(f"  [TX] Response sent ({len(report)} bytes)")
+                logger.debug("[TX] Response sent (%d bytes)", len(report))
 
             hid_device.send_data(report)
 
+        if protocol.device_info_queried:
+            device_info_event.set()
+        if protocol.pairing_complete:
+            pairing_event.set()
+
     def on_get_report_cb(
         report_id: int, report_type: int, buffer_size: int
     ) -> HID_Device.GetSetStatus:
         retValue = hid_device.GetSetStatus()
 
         logger.info(
-            f"GET_REPORT: ID=0x{report_id:02X}, Type={report_type}, Size={buffer_size}"
+            "GET_REPORT: ID=0x%02X, Type=%s, Size=%s",
+            report_id,
+            report_type,
+            buffer_size,
         )
 
         if report_type == Message.ReportType.INPUT_REPORT:
             if report_id == 0x21:
                 protocol.set_subcommand_reply()
-                retValue.data = bytes(protocol.get_report_no_clear()[1:])
                 retValue.status = hid_device.GetSetReturn.SUCCESS
-                print(f"  [GET] Subcommand reply (0x21)")
+                logger.debug("[GET] Subcommand reply (0x21)")
             elif report_id == 0x30:
                 protocol.set_full_input_report()
-                retValue.data = bytes(protocol.get_report_no_clear()[1:])
                 retValue.status = hid_device.GetSetReturn.SUCCESS
-                print(f"  [GET] Full input report (0x30)")
+                logger.debug("[GET] Full input report (0x30)")
             else:
                 retValue.status = hid_device.GetSetReturn.REPORT_ID_NOT_FOUND
 
-            if buffer_size:
-                data_len = buffer_size - 1
-                retValue.data = retValue.data[:data_len]
+            if retValue.status == hid_device.GetSetReturn.SUCCESS:
+                # Slice a view of the live report so the data is copied only once
+                report = memoryview(protocol.report)[1:]
+                if buffer_size:
+                    report = report[: buffer_size - 1]
+                retValue.data = bytes(report)
         else:
             retValue.status = hid_device.GetSetReturn.ERR_INVALID_PARAMETER
 
@@ -488,7 +519,10 @@ async def main() -> None:
         report_id: int, report_type: int, report_size: int, data: bytes
     ) -> HID_Device.GetSetStatus:
         logger.info(
-            f"SET_REPORT: ID=0x{report_id:02X}, Type={report_type}, Size={report_size}"
+            "SET_REPORT: ID=0x%02X, Type=%s, Size=%s",
+            report_id,
+            report_type,
+            report_size,
         )
 
         if report_type == Message.ReportType.OUTPUT_REPORT:
@@ -507,7 +541,7 @@ async def main() -> None:
         logger.warning("Virtual cable unplug received")
 
     async with await open_transport(sys.argv[2]) as hci_transport:
-        logger.info(f"Transport: {sys.argv[2]}")
+        logger.info("Transport: %s", sys.argv[2])
 
         # Create a device
         device = Device.from_config_file_with_hci(
@@ -518,15 +552,15 @@ async def main() -> None:
         device.public_address = Address(bt_address)
         device.keystore = None
 
-        logger.info(f"Device address: {device.public_address}")
-        logger.info(f"Device class: 0x{device.class_of_device:04X}")
-        logger.info(f"Device name: {device.name}")
+        logger.info("Device address: %s", device.public_address)
+        logger.info("Device class: 0x%04X", device.class_of_device)
+        logger.info("Device name: %s", device.name)
 
         # Create and register HID Device
         hid_device = HID_Device(device)
 
         async def on_connection(connection):
-            logger.info(f"Connection from: {connection.peer_address}")
+            logger.info("Connection from: %s", connection.peer_address)
 
             # try:
             #     await connection.authenticate()
@@ -535,7 +569,7 @@ async def main() -> None:
             #     await connection.encrypt()
             #     logger.info("Encryption enabled")
             # except Exception as e:
-            #     logger.error(f"Auth/Encrypt failed: {e}")
+            #     logger.error("Auth/Encrypt failed: %s", e)
 
         device.on("connection", on_connection)
 
@@ -550,10 +584,10 @@ async def main() -> None:
         hid_device.on("virtual_cable_unplug", on_virtual_cable_unplug_cb)
 
         # Setup the SDP to advertise HID Device service
-        device.sdp_service_records = sdp_records()
+        device.sdp_service_records = sdp_service_records()
 
-        logging.debug(f"Device class: 0x{device.class_of_device:04X}")
-        logging.debug(f"Device name: {device.name}")
+        logging.debug("Device class: 0x%04X", device.class_of_device)
+        logging.debug("Device name: %s", device.name)
 
         # Start the controller
         await device.power_on()
@@ -563,13 +597,16 @@ async def main() -> None:
         await device.set_discoverable(True)
         await device.set_connectable(True)
 
-        print("")
-        print("Waiting for Switch connection...")
-        print("  On Switch, go to: Controllers > Change Grip/Order")
-        print("")
-        print("-" * 60)
-        print("  [STATUS] Starting background report task")
-        print("-" * 60)
+        print(
+            "",
+            "Waiting for Switch connection...",
+            "  On Switch, go to: Controllers > Change Grip/Order",
+            "",
+            "-" * 60,
+            "  [STATUS] Starting background report task",
+            "-" * 60,
+            sep="\n",
+        )
 
         async def send_reports_task():
             nonlocal packet_count
@@ -578,61 +615,66 @@ async def main() -> None:
             while not pairing_event.is_set():
                 try:
                     protocol.process_commands(None)
-                    report = protocol.get_report()
-                    hid_device.send_data(report)
+                    # send_data copies the report, so send the live buffer
+                    # and clear it afterwards instead of copying it first
+                    hid_device.send_data(protocol.report_view())
+                    protocol.set_empty_report()
 
                     packet_count += 1
 
-                    if (
-                        received_first_message
-                        and protocol.vibration_enabled
-                        and protocol.player_number is not None
-                    ):
-                        print("")
-                        print("=" * 60)
-                        print("✓ PAIRING COMPLETE!")
-                        print("=" * 60)
-                        print(f"  Player Number: {protocol.player_number}")
-                        print(
-                            f"  Vibration: {'Enabled' if protocol.vibration_enabled else 'Disabled'}"
-                        )
-                        print(f"  Packets Exchanged: {packet_count}")
-                        print("=" * 60)
-                        pairing_event.set()
-                        break
-                    else:
-                        if packet_count % 30 == 0 and packet_count > 0:
-                            print(
-                                f"  [STATUS] Waiting... ({packet_count} packets sent)"
-                            )
+                    if packet_count % 30 == 0:
+                        print(f"  [STATUS] Waiting... ({packet_count} packets sent)")
 
                     if not received_first_message:
                         await asyncio.sleep(1)
                     else:
-                        await asyncio.sleep(1 / 15)
+                        await asyncio.sleep(PAIRING_REPORT_PERIOD)
 
                 except Exception as e:
                     print(f"\n✗ Error in send_reports_task: {e}")
-                    logger.error(f"Send reports task error: {e}")
+                    logger.error("Send reports task error: %s", e)
                     await asyncio.sleep(1)
 
         send_task = asyncio.create_task(send_reports_task())
 
         try:
+            # Set from on_hid_data_cb as soon as the pairing handshake completes
             await pairing_event.wait()
-            print("")
-            print("✓ Pairing complete - keeping connection alive")
-            print("  [STATUS] Press Ctrl+C to exit")
-            print("")
+            send_task.cancel()
+
+            vibration = "Enabled" if protocol.vibration_enabled else "Disabled"
+            print(
+                "",
+                "=" * 60,
+                "✓ PAIRING COMPLETE!",
+                "=" * 60,
+                f"  Player Number: {protocol.player_number}",
+                f"  Vibration: {vibration}",
+                f"  Packets Exchanged: {packet_count}",
+                "=" * 60,
+                "",
+                "✓ Pairing complete - keeping connection alive",
+                "  [STATUS] Press Ctrl+C to exit",
+                "",
+                sep="\n",
+            )
 
+            # Bind the names used at 132 Hz once, outside the loop
+            set_full_input_report = protocol.set_full_input_report
+            report = protocol.report_view()
+            set_empty_report = protocol.set_empty_report
+            send = hid_device.send_data
+            sleep = asyncio.sleep
+            period = FULL_REPORT_PERIOD
             try:
+                # Don't wake up 132 times a second before input is wanted
+                await device_info_event.wait()
                 while True:
-                    if protocol.device_info_queried:
-                        protocol.set_full_input_report()
-                        report = protocol.get_report()
-                        hid_device.send_data(report)
+                    set_full_input_report()
+                    send(report)
+                    set_empty_report()
 
-                    await asyncio.sleep(1 / 132)
+                    await sleep(period)
             except KeyboardInterrupt:
                 print("\n\n✓ Exiting gracefully...")
                 logger.info("User requested exit")
@@ -645,5 +687,5 @@ async def main() -> None:
                     pass
 
 
-bumble.logging.setup_basic_logging("DEBUG")
-asyncio.run(main())
+bumble.logging.setup_basic_logging("INFO")
+asyncio.run(main(), loop_factory=event_loop_factory())
@@ -1,38 +1,71 @@
-import random
-from enum import Enum
-from time import perf_counter
+import itertools
+from time import perf_counter_ns
 
 from controller import ControllerTypes
 
-
-def replace_subarray(arr, start_idx, length, value=None, replace_arr=None):
-    """
-    Replace a slice of arr with either a value or array.
-    Copied from nxbt utils.
-    """
-    if value is not None:
-        for i in range(start_idx, start_idx + length):
-            arr[i] = value
-    elif replace_arr is not None:
-        for i in range(min(length, len(replace_arr))):
-            arr[start_idx + i] = replace_arr[i]
-
-
-class SwitchResponses(Enum):
-    NO_DATA = -1
-    MALFORMED = -2
-    TOO_SHORT = -3
-    UNKNOWN_SUBCOMMAND = -4
-    REQUEST_DEVICE_INFO = 2
-    SET_SHIPMENT = 0x08
-    SPI_READ = 0x10
-    SET_MODE = 0x03
-    TRIGGER_BUTTONS = 0x04
-    TOGGLE_IMU = 0x40
-    ENABLE_VIBRATION = 0x48
-    SET_PLAYER = 0x30
-    SET_NFC_IR_STATE = 0x22
-    SET_NFC_IR_CONFIG = 0x21
+# Six-Axis sensor samples sent with every full input report while the IMU is
+# enabled: three samples of accelerometer X/Y/Z then gyro X/Y/Z
+_IMU_DATA = (
+    b"\x75\xfd\xfd\xff\x09\x10\x21\x00\xd5\xff\xe0\xff"
+    b"\x72\xfd\xf9\xff\x0a\x10\x22\x00\xd5\xff\xe0\xff"
+    b"\x76\xfd\xfc\xff\x09\x10\x23\x00\xd5\xff\xe0\xff"
+)
+
+# Stick Parameters
+# Params are generally the same for all sticks
+# Notable difference is the deadzone (10% Joy-Con vs 15% Pro Con)
+_PRO_CONTROLLER_STICK_PARAMS = (
+    b"\x0f\x30\x61"  # Unused
+    b"\x96\x30\xf3"  # Dead Zone/Range Ratio
+    b"\xd4\x14\x54"  # X/Y ?
+    b"\x41\x15\x54"  # X/Y ?
+    b"\xc7\x79\x9c"  # X/Y ?
+    b"\x33\x36\x63"  # X/Y ?
+)
+_JOYCON_STICK_PARAMS = (
+    _PRO_CONTROLLER_STICK_PARAMS[:3] + b"\xae" + _PRO_CONTROLLER_STICK_PARAMS[4:]
+)
+
+# Factory left/right stick calibration
+_L_CALIBRATION = b"\xba\xf5\x62\x6f\xc8\x77\xed\x95\x5b"
+_R_CALIBRATION = b"\x16\xd8\x7d\xf2\xb5\x5f\x86\x65\x5e"
+
+# Six-Axis motion sensor factory calibration
+_SA_CALIBRATION = (
+    b"\xd3\xff\xd5\xff\x55\x01"  # Acceleration origin position
+    b"\x00\x40\x00\x40\x00\x40"  # Acceleration sensitivity coefficient
+    b"\x19\x00\xdd\xff\xdc\xff"  # Gyro origin when still
+    b"\x3b\x34\x3b\x34\x3b\x34"  # Gyro sensitivity coefficient
+)
+
+# Player numbers by player lights bitfield, either solid or flashing
+_PLAYER_NUMBERS = {
+    0x01: 1,
+    0x10: 1,
+    0x03: 2,
+    0x30: 2,
+    0x07: 3,
+    0x70: 3,
+    0x0F: 4,
+    0xF0: 4,
+}
+
+# NFC/IR state data
+_NFC_IR_CONFIG_PARAMS = b"\x01\x00\xff\x00\x08\x00\x1b\x01"
+
+
+def _input_state_property(name):
+    """An attribute that repacks the standard input report state when set."""
+    private_name = "_" + name
+
+    def getter(self):
+        return getattr(self, private_name)
+
+    def setter(self, value):
+        setattr(self, private_name, value)
+        self._pack_input_state()
+
+    return property(getter, setter)
 
 
 class ControllerProtocol:
@@ -42,6 +75,19 @@ class ControllerProtocol:
         ControllerTypes.PRO_CONTROLLER: {"id": 0x03, "connection_info": 0x00},
     }
     VIBRATOR_BYTES = [0xA0, 0xB0, 0xC0, 0x90]
+    # Six-Axis factory parameters reported under SPI 0x6080
+    SIX_AXIS_FACTORY_PARAMS = {
+        ControllerTypes.JOYCON_L: b"\x5e\x01\x00\x00\xf1\x0f",
+        ControllerTypes.JOYCON_R: b"\x5e\x01\x00\x00\x0f\xf0",
+        ControllerTypes.PRO_CONTROLLER: b"\x50\xfd\x00\x00\xc6\x0f",
+    }
+
+    # Sent in every standard input report once device info is queried
+    battery_level = _input_state_property("battery_level")
+    connection_info = _input_state_property("connection_info")
+    button_status = _input_state_property("button_status")
+    left_stick_centre = _input_state_property("left_stick_centre")
+    right_stick_centre = _input_state_property("right_stick_centre")
 
     def __init__(
         self,
@@ -66,7 +112,8 @@ class ControllerProtocol:
         :param colour_buttons: Sets the colour of the controller buttons,
         defaults to None
         :type colour_buttons: list of bytes, optional
-        :raises ValueError: On unknown controller type
+        :raises ValueError: On unknown controller type or malformed
+        Bluetooth address
         """
 
         self.bt_address = bt_address
@@ -76,8 +123,27 @@ class ControllerProtocol:
         else:
             raise ValueError("Unknown controller type specified")
 
-        self.report = []
+        # Controller Bluetooth Address, parsed once for device info replies
+        address = bytes(int(byte, 16) for byte in bt_address.strip().split(":"))
+        if len(address) != 6:
+            raise ValueError("Invalid Bluetooth address specified")
+
+        # Device info subcommand reply data
+        self._device_info = (
+            # Firmware version
+            b"\x03\x8b"
+            # Controller ID, then an unknown byte that is always 2
+            + bytes((self.CONTROLLER_INFO[controller_type]["id"], 0x02))
+            + address
+            # Unknown byte, always 1
+            # Controller colours location (read from SPI)
+            + b"\x01\x01"
+        )
+
+        # The report buffer is allocated once and cleared in place
+        self.report = bytearray(report_size)
         self.report_size = report_size
+        self._empty_report = b"\xa1" + bytes(report_size - 1)
         self.set_empty_report()
 
         # Input report mode
@@ -96,35 +162,64 @@ class ControllerProtocol:
         self.timestamp = None
 
         # High/Low Nibble
-        self.battery_level = 0x90
-        self.connection_info = self.CONTROLLER_INFO[self.controller_type][
+        # The input state attributes are set through their private names here
+        # and packed once below, since each public setter repacks them all
+        self._battery_level = 0x90
+        self._connection_info = self.CONTROLLER_INFO[self.controller_type][
             "connection_info"
         ]
 
-        self.button_status = [0x00] * 3
+        self._button_status = bytes(3)
 
         # Disable left stick if we have a right Joy-Con
         if self.controller_type == ControllerTypes.JOYCON_R:
-            self.left_stick_centre = [0x00] * 3
+            self._left_stick_centre = bytes(3)
         else:
             # Center values which are also reported under
             # SPI Stick calibration reads
-            self.left_stick_centre = [0x6F, 0xC8, 0x77]
+            self._left_stick_centre = b"\x6f\xc8\x77"
 
         # Disable right stick if we have a left Joy-Con
         if self.controller_type == ControllerTypes.JOYCON_L:
-            self.right_stick_centre = [0x00] * 3
+            self._right_stick_centre = bytes(3)
         else:
             # Center values which are also reported under
             # SPI Stick calibration reads
-            self.right_stick_centre = [0x16, 0xD8, 0x7D]
+            self._right_stick_centre = b"\x16\xd8\x7d"
+
+        self._pack_input_state()
 
         self.vibration_enabled = False
-        self.vibrator_report = random.choice(self.VIBRATOR_BYTES)
+        self._vibrator_bytes = itertools.cycle(self.VIBRATOR_BYTES)
+        self.vibrator_report = next(self._vibrator_bytes)
+
+        # Set once the Switch has both enabled vibration and assigned a
+        # player number, which marks the end of the pairing handshake
+        self.pairing_complete = False
 
         # IMU (Six Axis Sensor) State
         self.imu_enabled = False
 
+        # Subcommand replies by subcommand ID: the ACK byte and subcommand
+        # reply ID, and a handler for anything past them (if any). Handlers
+        # are called with the raw output report (subcommand ID at byte 11,
+        # arguments from byte 12).
+        subcommand_replies = {
+            0x02: (b"\x82\x02", self.set_device_info),
+            0x08: (b"\x80\x08", None),  # Set shipment
+            0x10: (b"\x90\x10", self.spi_read),
+            0x03: (b"\x80\x03", self.set_mode),
+            0x04: (b"\x83\x04", None),  # Trigger buttons elapsed time
+            0x40: (b"\x80\x40", self.toggle_imu),
+            0x48: (b"\x82\x48", self.enable_vibration),
+            0x30: (b"\x80\x30", self.set_player_lights),
+            0x22: (b"\x80\x22", None),  # Set NFC/IR MCU state
+            0x21: (b"\xa0\x21", self.set_nfc_ir_config),
+        }
+        # Expanded to a table indexed by every possible subcommand ID, so
+        # dispatch is a plain index instead of a hash lookup
+        self._subcommand_replies = tuple(map(subcommand_replies.get, range(256)))
+
         # Controller colours
         # Body Colour
         if not colour_body:
@@ -136,89 +231,49 @@ class ControllerProtocol:
         else:
             self.colour_buttons = colour_buttons
 
+        # SPI flash reads are answered from payloads built up front, since
+        # the Switch repeats them while pairing
+        self._spi_payloads = self._build_spi_payloads()
+
     def get_report(self):
         report = bytes(self.report)
         # Clear report
         self.set_empty_report()
         return report
 
-    def get_report_no_clear(self):
-        """Get report WITHOUT clearing internal state.
+    def report_view(self):
+        """Get a zero-copy view of the current report.
 
-        This is used by on_hid_data_cb to send immediate responses
-        to Switch commands without clearing protocol state that is
-        needed by background send_reports_task for heartbeats.
+        The view tracks the live report buffer, so consume it (e.g. pass
+        it to send_data, which copies) before the report changes.
         """
-        return bytes(self.report)
+        return memoryview(self.report)
 
     def process_commands(self, data):
-        # Parsing the Switch's message
-        message = SwitchReportParser(data)
-
-        # Responding to the parsed message
-        if message.response == SwitchResponses.REQUEST_DEVICE_INFO:
-            self.device_info_queried = True
-            self.set_subcommand_reply()
-            self.set_device_info()
-
-        elif message.response == SwitchResponses.SET_SHIPMENT:
-            self.set_subcommand_reply()
-            self.set_shipment()
-
-        elif message.response == SwitchResponses.SPI_READ:
-            self.set_subcommand_reply()
-            self.spi_read(message)
-
-        elif message.response == SwitchResponses.SET_MODE:
-            self.set_subcommand_reply()
-            self.set_mode(message)
-
-        elif message.response == SwitchResponses.TRIGGER_BUTTONS:
-            self.set_subcommand_reply()
-            self.set_trigger_buttons()
-
-        elif message.response == SwitchResponses.TOGGLE_IMU:
-            self.set_subcommand_reply()
-            self.toggle_imu(message)
-
-        elif message.response == SwitchResponses.ENABLE_VIBRATION:
-            self.set_subcommand_reply()
-            self.enable_vibration()
-
-        elif message.response == SwitchResponses.SET_PLAYER:
-            self.set_subcommand_reply()
-            self.set_player_lights(message)
-
-        elif message.response == SwitchResponses.SET_NFC_IR_STATE:
-            self.set_subcommand_reply()
-            self.set_nfc_ir_state()
-
-        elif message.response == SwitchResponses.SET_NFC_IR_CONFIG:
-            self.set_subcommand_reply()
-            self.set_nfc_ir_config()
-
-        # Bad Packet handling statements
-        elif message.response == SwitchResponses.UNKNOWN_SUBCOMMAND:
-            # Currently set so that the controller ignores any unknown
-            # subcommands. This is better than sending a NACK response
-            # since we'd just get stuck in an infinite loop arguing
-            # with the Switch.
-            self.set_full_input_report()
-
-        elif message.response == SwitchResponses.NO_DATA:
+        # Bad packet handling. Empty, short and malformed packets are
+        # answered with a full input report, and so are unknown subcommands.
+        # Those are currently ignored rather than NACKed since we'd just get
+        # stuck in an infinite loop arguing with the Switch.
+        if not data or len(data) < 50 or data[0] != 0xA2:
             self.set_full_input_report()
+            return
 
-        elif message.response == SwitchResponses.TOO_SHORT:
+        # Dispatching on the raw subcommand ID
+        reply = self._subcommand_replies[data[11]]
+        if reply is None:
             self.set_full_input_report()
+            return
 
-        elif message.response == SwitchResponses.MALFORMED:
-            self.set_full_input_report()
+        # Handlers only write the subcommand reply (byte 14 onwards), so
+        # running them first lets the reply header reflect their state
+        header, handler = reply
+        if handler is not None:
+            handler(data)
+        self.report[14:16] = header
+        self.set_subcommand_reply()
 
     def set_empty_report(self):
-        empty_report = [0] * self.report_size
-        empty_report[0] = 0xA1
-
-        self.report = empty_report
+        self.report[:] = self._empty_report
 
     def set_subcommand_reply(self):
         # Input Report ID
@@ -227,8 +282,9 @@ class ControllerProtocol:
         # TODO: Find out what the vibrator byte is doing.
         # This is a hack in an attempt to semi-emulate
         # actions of the vibrator byte as it seems to change
-        # when a subcommand reply is sent.
-        self.vibrator_report = random.choice(self.VIBRATOR_BYTES)
+        # when a subcommand reply is sent. The Switch accepts any of the
+        # values, so cycling through them is enough.
+        self.vibrator_report = next(self._vibrator_bytes)
 
         self.set_standard_input_report()
 
@@ -240,20 +296,18 @@ class ControllerProtocol:
         self.report[15] = subcommand_id
 
     def set_timer(self):
+        now = perf_counter_ns()
+
         # If the timer hasn't been set before
-        if not self.timestamp:
-            self.timestamp = perf_counter()
+        if self.timestamp is None:
+            self.timestamp = now
             self.report[2] = 0x00
             return
 
-        # Get the time that has passed since the last timestamp
-        # in milliseconds
-        now = perf_counter()
-        delta_t = (now - self.timestamp) * 1000
-
-        # Get how many ticks have passed in hex with overflow at 255
+        # Get how many ticks have passed since the last timestamp (in
+        # integer nanoseconds) with overflow at 255
         # Joy-Con uses 4.96ms as the timer tick rate
-        elapsed_ticks = int(delta_t * 4)
+        elapsed_ticks = (now - self.timestamp) * 4 // 1_000_000
         self.timer = (self.timer + elapsed_ticks) & 0xFF
 
         self.report[2] = self.timer
@@ -266,24 +320,29 @@ class ControllerProtocol:
         self.set_imu_data()
 
     def set_standard_input_report(self):
+        # Buttons/sticks are only sent once device info has been queried,
+        # at which point set_device_info rebinds this method on the
+        # instance to _set_standard_input_report_queried
         self.set_timer()
 
-        if self.device_info_queried:
-            self.report[3] = self.battery_level + self.connection_info
-
-            self.report[4] = self.button_status[0]
-            self.report[5] = self.button_status[1]
-            self.report[6] = self.button_status[2]
-
-            self.report[7] = self.left_stick_centre[0]
-            self.report[8] = self.left_stick_centre[1]
-            self.report[9] = self.left_stick_centre[2]
-
-            self.report[10] = self.right_stick_centre[0]
-            self.report[11] = self.right_stick_centre[1]
-            self.report[12] = self.right_stick_centre[2]
-
-            self.report[13] = self.vibrator_report
+    def _pack_input_state(self):
+        # Battery/connection info, buttons and stick centres as one slice,
+        # repacked whenever one of them is assigned
+        input_state = (
+            bytes((self._battery_level + self._connection_info,))
+            + bytes(self._button_status)
+            + bytes(self._left_stick_centre)
+            + bytes(self._right_stick_centre)
+        )
+        # A slice of any other length would resize the report
+        if len(input_state) != 10:
+            raise ValueError("Button status and stick centres must be 3 bytes")
+        self._input_state = input_state
+
+    def _set_standard_input_report_queried(self):
+        self.set_timer()
+        self.report[3:13] = self._input_state
+        self.report[13] = self.vibrator_report
 
     def set_button_inputs(self, upper, shared, lower):
         self.report[4] = upper
@@ -291,121 +350,90 @@ class ControllerProtocol:
         self.report[6] = lower
 
     def set_left_stick_inputs(self, left):
-        self.report[7] = left[0]
-        self.report[8] = left[1]
-        self.report[9] = left[2]
+        # A slice of any other length would resize the report
+        if len(left) != 3:
+            raise ValueError("Stick inputs must be 3 bytes")
+        self.report[7:10] = left
 
     def set_right_stick_inputs(self, right):
-        self.report[10] = right[0]
-        self.report[11] = right[1]
-        self.report[12] = right[2]
-
-    def set_device_info(self):
-        # ACK Reply
-        self.report[14] = 0x82
-
-        # Subcommand Reply
-        self.report[15] = 0x02
-
-        # Firmware version
-        self.report[16] = 0x03
-        self.report[17] = 0x8B
-
-        # Controller ID
-        self.report[18] = self.CONTROLLER_INFO[self.controller_type]["id"]
-
-        # Unknown Byte, always 2
-        self.report[19] = 0x02
-
-        # Controller Bluetooth Address
-        address = self.bt_address.strip().split(":")  # Getting from adapter
-        address_location = 20
-        for address_byte_str in address:
-            # Converting string address bytes to hex
-            # and assigning to report
-            address_byte = int(address_byte_str, 16)
-            self.report[address_location] = address_byte
-            address_location += 1
-
-        # Unknown byte, always 1
-        self.report[26] = 0x01
+        if len(right) != 3:
+            raise ValueError("Stick inputs must be 3 bytes")
+        self.report[10:13] = right
 
-        # Controller colours location (read from SPI)
-        self.report[27] = 0x01
+    def set_device_info(self, data):
+        self.device_info_queried = True
+        self.set_standard_input_report = self._set_standard_input_report_queried
 
-    def set_shipment(self):
-        # ACK Reply
-        self.report[14] = 0x80
+        self.report[16:28] = self._device_info
 
-        # Subcommand reply
-        self.report[15] = 0x08
-
-    def toggle_imu(self, message):
-        if message.subcommand[1] == 0x01:
+    def toggle_imu(self, data):
+        if data[12] == 0x01:
             self.imu_enabled = True
         else:
             self.imu_enabled = False
 
-        # ACK Reply
-        self.report[14] = 0x80
-
-        # Subcommand reply
-        self.report[15] = 0x40
-
     def set_imu_data(self):
         if not self.imu_enabled:
             return
 
-        imu_data = [
-            0x75,
-            0xFD,
-            0xFD,
-            0xFF,
-            0x09,
-            0x10,
-            0x21,
-            0x00,
-            0xD5,
-            0xFF,
-            0xE0,
-            0xFF,
-            0x72,
-            0xFD,
-            0xF9,
-            0xFF,
-            0x0A,
-            0x10,
-            0x22,
-            0x00,
-            0xD5,
-            0xFF,
-            0xE0,
-            0xFF,
-            0x76,
-            0xFD,
-            0xFC,
-            0xFF,
-            0x09,
-            0x10,
-            0x23,
-            0x00,
-            0xD5,
-            0xFF,
-            0xE0,
-            0xFF,
-        ]
-        replace_subarray(self.report, 14, 49, replace_arr=imu_data)
+        self.report[14:50] = _IMU_DATA
+
+    def _build_spi_payloads(self):
+        """Builds the SPI flash contents returned by spi_read.
+
+        :return: Payloads written to the report from byte 21, keyed by
+        (address top byte, address bottom byte)
+        :rtype: dict
+        """
+        # Adjusting deadzone for Joy-Cons
+        if self.controller_type == ControllerTypes.PRO_CONTROLLER:
+            params = _PRO_CONTROLLER_STICK_PARAMS
+        else:
+            params = _JOYCON_STICK_PARAMS
 
-    def spi_read(self, message):
-        addr_top = message.subcommand[2]
-        addr_bottom = message.subcommand[1]
-        read_length = message.subcommand[5]
+        # Left/right stick calibration
+        # If null, fill with 0xFF
+        if not self.controller_type == ControllerTypes.JOYCON_R:
+            l_calibration = _L_CALIBRATION
+        else:
+            l_calibration = b"\xff" * 9
+        if not self.controller_type == ControllerTypes.JOYCON_L:
+            r_calibration = _R_CALIBRATION
+        else:
+            r_calibration = b"\xff" * 9
 
-        # ACK byte
-        self.report[14] = 0x90
+        colours = bytes(self.colour_body) + bytes(self.colour_buttons)
 
-        # Subcommand reply
-        self.report[15] = 0x10
+        return {
+            # Serial Number read
+            # Switch will take this as no serial number
+            (0x60, 0x00): b"\xff" * 16,
+            # Colours
+            # Body and buttons colour, then left/right grip colours
+            # (Pro controller)
+            (0x60, 0x50): colours + b"\xff" * 7,
+            # Factory sensor/stick device parameters
+            # Six-Axis factory parameters, then stick parameters
+            (0x60, 0x80): self.SIX_AXIS_FACTORY_PARAMS[self.controller_type] + params,
+            # Stick device parameters 2
+            # Setting same params since controllers always
+            # have duplicates of stick params 1 for stick params 2
+            (0x60, 0x98): params,
+            # User analog stick calibration
+            # Fill report with null user calibration info
+            (0x80, 0x10): b"\xff" * 24,
+            # Factory analog stick calibration
+            # Left/right stick calibration, a spacer byte, then body and
+            # buttons colour
+            (0x60, 0x3D): l_calibration + r_calibration + b"\xff" + colours,
+            # Six-Axis motion sensor factor calibration
+            (0x60, 0x20): _SA_CALIBRATION,
+        }
+
+    def spi_read(self, data):
+        addr_top = data[13]
+        addr_bottom = data[12]
+        read_length = data[16]
 
         # Read address
         self.report[16] = addr_bottom
@@ -414,251 +442,33 @@ class ControllerProtocol:
         # Read length
         self.report[20] = read_length
 
-        # Stick Parameters
-        # Params are generally the same for all sticks
-        # Notable difference is the deadzone (10% Joy-Con vs 15% Pro Con)
-        params = [
-            0x0F,
-            0x30,
-            0x61,  # Unused
-            0x96,
-            0x30,
-            0xF3,  # Dead Zone/Range Ratio
-            0xD4,
-            0x14,
-            0x54,  # X/Y ?
-            0x41,
-            0x15,
-            0x54,  # X/Y ?
-            0xC7,
-            0x79,
-            0x9C,  # X/Y ?
-            0x33,
-            0x36,
-            0x63,
-        ]  # X/Y ?
-        # Adjusting deadzone for Joy-Cons
-        if not self.controller_type == ControllerTypes.PRO_CONTROLLER:
-            params[3] = 0xAE
-
-        # Serial Number read
-        if addr_top == 0x60 and addr_bottom == 0x00:
-            # Switch will take this as no serial number
-            replace_subarray(self.report, 21, 16, 0xFF)
-
-        # Colours
-        elif addr_top == 0x60 and addr_bottom == 0x50:
-            # Body colour
-            replace_subarray(self.report, 21, 3, replace_arr=self.colour_body)
-            # Buttons colour
-            replace_subarray(self.report, 24, 3, replace_arr=self.colour_buttons)
-            # Left/right grip colours (Pro controller)
-            replace_subarray(self.report, 27, 7, 0xFF)
-
-        # Factory sensor/stick device parameters
-        elif addr_top == 0x60 and addr_bottom == 0x80:
-            # Six-Axis factory parameters
-            if self.controller_type == ControllerTypes.PRO_CONTROLLER:
-                self.report[21] = 0x50
-                self.report[22] = 0xFD
-                self.report[23] = 0x00
-                self.report[24] = 0x00
-                self.report[25] = 0xC6
-                self.report[26] = 0x0F
-            else:
-                self.report[21] = 0x5E
-                self.report[22] = 0x01
-                self.report[23] = 0x00
-                self.report[24] = 0x00
-                if self.controller_type == ControllerTypes.JOYCON_L:
-                    self.report[25] = 0xF1
-                    self.report[26] = 0x0F
-                else:
-                    self.report[25] = 0x0F
-                    self.report[26] = 0xF0
-
-            replace_subarray(self.report, 27, 18, replace_arr=params)
-
-        # Stick device parameters 2
-        elif addr_top == 0x60 and addr_bottom == 0x98:
-            # Setting same params since controllers always
-            # have duplicates of stick params 1 for stick params 2
-            replace_subarray(self.report, 21, 18, replace_arr=params)
+        payload = self._spi_payloads.get((addr_top, addr_bottom))
+        if payload is not None:
+            self.report[21 : 21 + len(payload)] = payload
 
-        # User analog stick calibration
-        elif addr_top == 0x80 and addr_bottom == 0x10:
-            # Fill report with null user calibration info
-            replace_subarray(self.report, 21, 24, 0xFF)
-
-        # Factory analog stick calibration
-        elif addr_top == 0x60 and addr_bottom == 0x3D:
-            # Left/right stick calibration
-            l_calibration = [0xBA, 0xF5, 0x62, 0x6F, 0xC8, 0x77, 0xED, 0x95, 0x5B]
-            r_calibration = [0x16, 0xD8, 0x7D, 0xF2, 0xB5, 0x5F, 0x86, 0x65, 0x5E]
-
-            # Left stick calibration
-            # If null, fill with 0xFF
-            if not self.controller_type == ControllerTypes.JOYCON_R:
-                replace_subarray(self.report, 21, 9, replace_arr=l_calibration)
-            else:
-                replace_subarray(self.report, 21, 9, value=0xFF)
-
-            # Right stick calibration
-            # If null, fill with 0xFF
-            if not self.controller_type == ControllerTypes.JOYCON_L:
-                replace_subarray(self.report, 30, 9, replace_arr=r_calibration)
-            else:
-                replace_subarray(self.report, 30, 9, value=0xFF)
-
-            # Spacer byte
-            self.report[39] = 0xFF
-
-            # Body colour
-            replace_subarray(self.report, 40, 3, replace_arr=self.colour_body)
-            # Buttons colour
-            replace_subarray(self.report, 43, 3, replace_arr=self.colour_buttons)
-
-        # Six-Axis motion sensor factor calibration
-        elif addr_top == 0x60 and addr_bottom == 0x20:
-            # 1: Acceleration origin position
-            # 2: Acceleration sensitivity coefficient
-            # 3: Gyro origin when still
-            # 4: Gyro sensitivity coefficient
-            sa_calibration = [
-                0xD3,
-                0xFF,
-                0xD5,
-                0xFF,
-                0x55,
-                0x01,  # 1
-                0x00,
-                0x40,
-                0x00,
-                0x40,
-                0x00,
-                0x40,  # 2
-                0x19,
-                0x00,
-                0xDD,
-                0xFF,
-                0xDC,
-                0xFF,  # 3
-                0x3B,
-                0x34,
-                0x3B,
-                0x34,
-                0x3B,
-                0x34,
-            ]  # 4
-
-            replace_subarray(self.report, 21, 24, replace_arr=sa_calibration)
-
-    def set_mode(self, message):
-        # ACK byte
-        self.report[14] = 0x80
-
-        # Subcommand reply
-        self.report[15] = 0x03
-
-        if message.subcommand[1] == 0x30:
+    def set_mode(self, data):
+        if data[12] == 0x30:
             self.mode = "standard"
-        elif message.subcommand[1] == 0x31:
+        elif data[12] == 0x31:
             self.mode = "nfc/ir"
-        elif message.subcommand[1] == 0x3F:
+        elif data[12] == 0x3F:
             self.mode = "simpleHID"
 
-    def set_trigger_buttons(self):
-        # ACK byte
-        self.report[14] = 0x83
-
-        # Subcommand reply
-        self.report[15] = 0x04
-
-    def enable_vibration(self):
-        # ACK Reply
-        self.report[14] = 0x82
-
-        # Subcommand reply
-        self.report[15] = 0x48
-
+    def enable_vibration(self, data):
         # Set class property
         self.vibration_enabled = True
+        self.pairing_complete = self.player_number is not None
 
-    def set_player_lights(self, message):
-        # ACK byte
-        self.report[14] = 0x80
-
-        # Subcommand reply
-        self.report[15] = 0x30
+    def set_player_lights(self, data):
+        player_number = _PLAYER_NUMBERS.get(data[12])
+        if player_number is not None:
+            self.player_number = player_number
 
-        bitfield = message.subcommand[1]
-
-        if bitfield == 0x01 or bitfield == 0x10:
-            self.player_number = 1
-        elif bitfield == 0x03 or bitfield == 0x30:
-            self.player_number = 2
-        elif bitfield == 0x07 or bitfield == 0x70:
-            self.player_number = 3
-        elif bitfield == 0x0F or bitfield == 0xF0:
-            self.player_number = 4
-
-    def set_nfc_ir_state(self):
-        # ACK byte
-        self.report[14] = 0x80
-
-        # Subcommand reply
-        self.report[15] = 0x22
-
-    def set_nfc_ir_config(self):
-        # ACK byte
-        self.report[14] = 0xA0
-
-        # Subcommand reply
-        self.report[15] = 0x21
+        self.pairing_complete = (
+            self.vibration_enabled and self.player_number is not None
+        )
 
+    def set_nfc_ir_config(self, data):
         # NFC/IR state data
-        params = [0x01, 0x00, 0xFF, 0x00, 0x08, 0x00, 0x1B, 0x01]
-        replace_subarray(self.report, 16, 8, replace_arr=params)
+        self.report[16:24] = _NFC_IR_CONFIG_PARAMS
         self.report[49] = 0xC8
-
-
-class SwitchReportParser:
-    SUBCOMMANDS = {
-        0x02: SwitchResponses.REQUEST_DEVICE_INFO,
-        0x08: SwitchResponses.SET_SHIPMENT,
-        0x10: SwitchResponses.SPI_READ,
-        0x03: SwitchResponses.SET_MODE,
-        0x04: SwitchResponses.TRIGGER_BUTTONS,
-        0x40: SwitchResponses.TOGGLE_IMU,
-        0x48: SwitchResponses.ENABLE_VIBRATION,
-        0x30: SwitchResponses.SET_PLAYER,
-        0x22: SwitchResponses.SET_NFC_IR_STATE,
-        0x21: SwitchResponses.SET_NFC_IR_CONFIG,
-    }
-
-    def __init__(self, data, data_length=50):
-        # Non-data check
-        if not data:
-            self.response = SwitchResponses.NO_DATA
-            return
-
-        # Report length check
-        if len(data) < data_length:
-            self.response = SwitchResponses.TOO_SHORT
-            return
-
-        # First byte check
-        if data[0] != 0xA2:
-            self.response = SwitchResponses.MALFORMED
-            return
-
-        # Splitting data
-        self.payload = data[:11]
-        self.subcommand = data[11:]
-        self.subcommand_id = self.subcommand[0]
-
-        # Parsing the subcommand
-        if self.subcommand[0] in self.SUBCOMMANDS.keys():
-            self.response = self.SUBCOMMANDS[self.subcommand[0]]
-        else:
-            self.response = SwitchResponses.UNKNOWN_SUBCOMMAND
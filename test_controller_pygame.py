@@ -1,5 +1,3 @@
-import time
-
 import pygame
 
 
@@ -18,6 +16,19 @@ def run_joystick_only():
     joystick.init()
     print(f"Initialized Joystick: {joystick.get_name()}")
 
+    # The control counts are fixed for a connected joystick
+    axis_count = joystick.get_numaxes()
+    button_count = joystick.get_numbuttons()
+    hat_count = joystick.get_numhats()
+
+    # Last seen state of each control, so only changes are printed
+    prev_axes = [0.0] * axis_count
+    prev_buttons = bytearray(button_count)
+    prev_hats = [(0, 0)] * hat_count
+
+    # Polls on a steady 60 Hz schedule without spinning the CPU
+    clock = pygame.time.Clock()
+
     try:
         while True:
             # Must call pump() or get() to process events
@@ -25,25 +36,34 @@ def run_joystick_only():
 
             # --- Check Axes (Analog sticks) ---
             # Axes usually return a value between -1.0 and 1.0
-            for i in range(joystick.get_numaxes()):
-                axis_value = joystick.get_axis(i)
-                if abs(axis_value) > 0.1:  # Filter out minor noise
-                    print(f"Axis {i}: {axis_value:.2f}")
+            for i in range(axis_count):
+                axis_value = round(joystick.get_axis(i), 2)
+                if abs(axis_value) <= 0.1:  # Filter out minor noise
+                    axis_value = 0.0
+                if axis_value != prev_axes[i]:
+                    prev_axes[i] = axis_value
+                    if axis_value:
+                        print(f"Axis {i}: {axis_value:.2f}")
 
             # --- Check Buttons ---
             # Buttons usually return 0 for up, 1 for down
-            for i in range(joystick.get_numbuttons()):
-                if joystick.get_button(i):
-                    print(f"Button {i} pressed")
+            for i in range(button_count):
+                button = joystick.get_button(i)
+                if button != prev_buttons[i]:
+                    prev_buttons[i] = button
+                    if button:
+                        print(f"Button {i} pressed")
 
             # --- Check Hats (D-pads) ---
             # Hats return a tuple (x, y) with values like (-1, 0), (1, 0), etc.
-            for i in range(joystick.get_numhats()):
+            for i in range(hat_count):
                 hat_value = joystick.get_hat(i)
-                if hat_value != (0, 0):
-                    print(f"Hat {i}: {hat_value}")
+                if hat_value != prev_hats[i]:
+                    prev_hats[i] = hat_value
+                    if hat_value != (0, 0):
+                        print(f"Hat {i}: {hat_value}")
 
-            time.sleep(0.1)  # Small delay to prevent 100% CPU usage
+            clock.tick(60)
 
     except KeyboardInterrupt:
         print("Exiting...")